@@ -2,10 +2,27 @@ import streamlit as st
 from google.oauth2 import service_account
 from google.cloud import storage
 from google.cloud import bigquery
+from google.auth.transport.requests import AuthorizedSession
+from google.resumable_media import common as resumable_common
+from google.resumable_media.requests import ResumableUpload
+import hashlib
+import imageio_ffmpeg
 import json
 import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import uuid
+import sys
+
+# Shared modules live at the repo root, one level above this page
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inspiration_jobs import InspirationJobQueue, local_stand_in_analysis
 
 st.set_page_config(page_title="Post Analyzer", layout="wide", page_icon="🚝")
 
@@ -43,16 +60,246 @@ bucket_name = "bizbuddyfiles_inspiration"  # All file types go to the same bucke
 
 bq_client = bigquery.Client(credentials=credentials, project=project_id)
 
+# Resumable upload settings, the chunk size must be a multiple of 256 KB
+UPLOAD_CHUNK_SIZE = int(config.get("UPLOAD_CHUNK_MB", 8)) * 1024 * 1024
+UPLOAD_MAX_RETRIES = 5
+UPLOAD_WORKERS = 2
+
+# Preview frames, extracted once at ingest and stored under frames/<video_id>/
+POSTER_FRAME_SECONDS = 1  # Skip the first second, which is often a black or title frame
+FRAME_WIDTHS = {"poster": 1280, "thumbnail": 500}
+
+# Inspiration gallery settings
+MANIFEST_TABLE_ID = "bizbuddydemo-v2.inspo_data.inspiration_manifest"
+GALLERY_PAGE_SIZE = 10
+
+# Signed URL settings for private inspiration media
+SIGNED_URL_TTL = timedelta(hours=24)
+SIGNED_URL_REFRESH_MARGIN = timedelta(hours=1)  # Re-sign URLs this close to expiry
+SIGNED_URL_CACHE_SIZE = 500
+
+
+class SignedUrlCache:
+    """
+    LRU cache of signed GET URLs keyed by object name. URLs are re-signed
+    shortly before they expire, and signing happens locally with the service
+    account key, so a warm cache renders the gallery without storage API calls.
+    """
+
+    def __init__(self, ttl=SIGNED_URL_TTL, refresh_margin=SIGNED_URL_REFRESH_MARGIN, max_entries=SIGNED_URL_CACHE_SIZE):
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._urls = OrderedDict()
+
+    def get(self, blob_name):
+        now = datetime.now()
+        with self._lock:
+            cached = self._urls.get(blob_name)
+            if cached and cached[1] - now > self.refresh_margin:
+                self._urls.move_to_end(blob_name)
+                return cached[0]
+
+        url = storage_client.bucket(bucket_name).blob(blob_name).generate_signed_url(expiration=self.ttl, method="GET")
+
+        with self._lock:
+            self._urls[blob_name] = (url, now + self.ttl)
+            self._urls.move_to_end(blob_name)
+            while len(self._urls) > self.max_entries:
+                self._urls.popitem(last=False)
+        return url
+
+
+@st.cache_resource
+def get_signed_url_cache():
+    return SignedUrlCache()
+
+
+# Processing status settings, the poller itself lives in inspiration_jobs.py
+JOB_STATUS_POLL_SECONDS = 5
+# Set INSPO_LOCAL_WORKER=1 to use the stand-in check instead of waiting on the analysis pipeline, e.g. for tests
+INSPO_LOCAL_WORKER = os.environ.get("INSPO_LOCAL_WORKER") == "1"
+
+JOB_STATE_ICONS = {"uploaded": "📤", "queued": "🕒", "analyzing": "🔍", "done": "✅", "failed": "⚠️"}
+
+
+def check_analysis_done(jobs):
+    """Returns the video_ids among the jobs whose notes the analysis pipeline has written, in one query for all of them."""
+    query = """
+    SELECT DISTINCT video_id
+    FROM `bizbuddydemo-v2.inspo_data.inspiration_analysis`
+    WHERE video_id IN UNNEST(@video_ids)
+    """
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ArrayQueryParameter("video_ids", "STRING", [job["video_id"] for job in jobs])]
+    )
+    finished = {row.video_id for row in bq_client.query(query, job_config=job_config).result()}
+    if finished:
+        # Let the gallery pick up the new notes
+        fetch_manifest_page.clear()
+    return finished
+
+
+@st.cache_resource
+def get_job_queue():
+    return InspirationJobQueue(local_stand_in_analysis if INSPO_LOCAL_WORKER else check_analysis_done)
+
+
+class UploadJob:
+    """
+    Chunked, resumable upload of one file to Cloud Storage, run on a worker
+    thread so the script thread is free to report progress. When a chunk
+    fails, the server is asked how many bytes it kept and only the rest is resent.
+    """
+
+    def __init__(self, stream, blob_name, content_type, chunk_size=UPLOAD_CHUNK_SIZE, max_retries=UPLOAD_MAX_RETRIES):
+        self.stream = stream
+        self.blob_name = blob_name
+        self.content_type = content_type
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.total_bytes = stream.seek(0, os.SEEK_END)
+        self.bytes_uploaded = 0
+        self.retries = 0
+        self.future = None
+
+    @property
+    def progress(self):
+        return self.bytes_uploaded / self.total_bytes if self.total_bytes else 1.0
+
+    def run(self):
+        transport = AuthorizedSession(credentials)
+        upload_url = f"https://storage.googleapis.com/upload/storage/v1/b/{bucket_name}/o?uploadType=resumable"
+        upload = ResumableUpload(upload_url, self.chunk_size)
+
+        self.stream.seek(0)
+        upload.initiate(transport, self.stream, {"name": self.blob_name}, self.content_type, total_bytes=self.total_bytes)
+
+        # Connection errors and 5xx responses are retried per request by the library itself
+        failures = 0
+        while not upload.finished:
+            try:
+                upload.transmit_next_chunk(transport)
+                failures = 0
+            except resumable_common.InvalidResponse:
+                failures += 1
+                self.retries += 1
+                if failures > self.max_retries:
+                    raise
+                time.sleep(min(2 ** failures, 30))
+                # Rewinds the stream to the last byte the server has
+                upload.recover(transport)
+            self.bytes_uploaded = upload.bytes_uploaded
+
+
+@st.cache_resource
+def get_upload_executor():
+    return ThreadPoolExecutor(max_workers=UPLOAD_WORKERS)
+
+
+def start_upload(uploaded_file, blob_name):
+    """Start uploading the file in the background and return its UploadJob."""
+    job = UploadJob(uploaded_file, blob_name, uploaded_file.type)
+    job.future = get_upload_executor().submit(job.run)
+    return job
+
+
+def wait_for_upload(job):
+    """Show the job's progress until it finishes. Returns True if the upload succeeded."""
+    progress_bar = st.progress(job.progress, text="Uploading...")
+    while not job.future.done():
+        progress_bar.progress(job.progress, text=f"Uploading... {job.bytes_uploaded / 1e6:,.0f} of {job.total_bytes / 1e6:,.0f} MB")
+        time.sleep(0.5)
+
+    error = job.future.exception()
+    if error:
+        progress_bar.empty()
+        st.error(f"Upload failed, please try again.\nError: {error}")
+        return False
+
+    progress_bar.progress(1.0, text="Upload complete")
+    return True
+
+
+def extract_frame(video_path, width, frame_path):
+    """Grabs one frame from the video as a JPEG scaled to the given width. Returns True if a frame was written."""
+    # Clips shorter than POSTER_FRAME_SECONDS have no frame there, so fall back to the first one
+    for seek in (POSTER_FRAME_SECONDS, 0):
+        result = subprocess.run(
+            [imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error", "-ss", str(seek), "-i", video_path,
+             "-frames:v", "1", "-vf", f"scale={width}:-2", "-q:v", "3", frame_path],
+            capture_output=True
+        )
+        if result.returncode == 0 and os.path.exists(frame_path) and os.path.getsize(frame_path):
+            return True
+    return False
+
+
+def extract_video_frames(uploaded_file, video_id):
+    """Extracts the poster and thumbnail frames, stores them beside the video and returns their blob names (None where extraction failed)."""
+    frames = dict.fromkeys(FRAME_WIDTHS)
+    bucket = storage_client.bucket(bucket_name)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = os.path.join(tmp_dir, "video")
+        # Copy in chunks so a large video isn't held in memory a second time
+        uploaded_file.seek(0)
+        with open(video_path, "wb") as f:
+            shutil.copyfileobj(uploaded_file, f, UPLOAD_CHUNK_SIZE)
+
+        for frame, width in FRAME_WIDTHS.items():
+            frame_path = os.path.join(tmp_dir, f"{frame}.jpg")
+            try:
+                if not extract_frame(video_path, width, frame_path):
+                    st.warning(f"Couldn't create the {frame} image for this video, ffmpeg could not read a frame from it.")
+                    continue
+                blob_name = f"frames/{video_id}/{frame}.jpg"
+                bucket.blob(blob_name).upload_from_filename(frame_path, content_type="image/jpeg")
+                frames[frame] = blob_name
+            except Exception as e:
+                # The video is already stored, so a missing preview shouldn't fail the upload
+                st.warning(f"Couldn't create the {frame} image for this video.\nError: {e}")
+
+    return frames
+
+
+def compute_content_hash(stream, chunk_size=UPLOAD_CHUNK_SIZE):
+    """SHA-256 of the file, read a chunk at a time so large videos never sit in memory twice."""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def find_existing_video(page_id, content_hash):
+    """Returns the video_id already ingested for this content on the page, or None."""
+    query = """
+    SELECT video_id
+    FROM `bizbuddydemo-v2.inspo_data.inspoextractholder`
+    WHERE page_id = @page_id AND content_hash = @content_hash
+    LIMIT 1
+    """
+
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ScalarQueryParameter("page_id", "INT64", page_id),
+            bigquery.ScalarQueryParameter("content_hash", "STRING", content_hash),
+        ]
+    )
+
+    rows = list(bq_client.query(query, job_config=job_config).result())
+    return rows[0].video_id if rows else None
 
-def insert_into_bq(page_id, inspiration_context):
-    """Inserts a new row into BigQuery and returns the generated video_id."""
+
+def insert_into_bq(page_id, video_id, inspiration_context, content_hash):
+    """Inserts a new row into BigQuery for an uploaded video."""
     
     # Define your BigQuery table
     table_id = "bizbuddydemo-v2.inspo_data.inspoextractholder"
 
-    # Generate a unique video ID
-    video_id = str(uuid.uuid4())
-
     # Get today's date in standard format
     upload_date = datetime.today().strftime('%Y-%m-%d')
 
@@ -62,7 +309,8 @@ def insert_into_bq(page_id, inspiration_context):
             "page_id": page_id,
             "video_id": video_id,
             "inspiration_context": inspiration_context,
-            "uploaded_date": upload_date
+            "uploaded_date": upload_date,
+            "content_hash": content_hash
         }
     ]
 
@@ -73,117 +321,284 @@ def insert_into_bq(page_id, inspiration_context):
         st.write(f"BigQuery insertion errors: {errors}")
     else:
         st.write(f"Inserted row with video_id: {video_id}")
-
-    return video_id  # Return generated ID to use for file naming
     
 
-def upload_to_gcs(uploaded_file, file_type, page_id, inspiration_context):
-    """Uploads file to Google Cloud Storage with a generated video_id and returns a signed URL."""
-    bucket = storage_client.bucket(bucket_name)
-    
-    # Generate a unique ID and insert the data into BigQuery
-    video_id = insert_into_bq(page_id, inspiration_context)
+def manifest_row(page_id, video_id, blob_name, content_type, size_bytes, content_hash, uploaded_at, poster_blob_name=None, thumbnail_blob_name=None):
+    return {
+        "page_id": page_id,
+        "video_id": video_id,
+        "blob_name": blob_name,
+        "poster_blob_name": poster_blob_name,
+        "thumbnail_blob_name": thumbnail_blob_name,
+        "content_type": content_type,
+        "size_bytes": size_bytes,
+        "content_hash": content_hash,
+        "uploaded_at": uploaded_at.isoformat()
+    }
+
+
+def add_to_manifest(rows):
+    """Adds entries to the page-scoped manifest the gallery reads from."""
+    errors = bq_client.insert_rows_json(MANIFEST_TABLE_ID, rows)
+    if errors:
+        st.write(f"BigQuery manifest insertion errors: {errors}")
 
-    # Extract file extension
-    file_ext = uploaded_file.name.split('.')[-1]
-    
-    # Create new filename (video_id + file extension)
-    new_filename = f"{video_id}.{file_ext}"
-    
-    blob = bucket.blob(new_filename)
+    # New entries should show up in the gallery straight away
+    fetch_manifest_page.clear()
 
-    # Upload file
-    blob.upload_from_file(uploaded_file, content_type=uploaded_file.type)
 
-    # Generate a signed URL (valid for 24 hours)
-    signed_url = blob.generate_signed_url(
-        expiration=timedelta(hours=24),  # Change expiration time as needed
-        method="GET"
+@st.cache_resource(show_spinner=False)
+def backfill_manifest(page_id):
+    """One-off per page: adds videos uploaded before the manifest existed. Returns how many were added."""
+    query = """
+    SELECT DISTINCT video_id
+    FROM `bizbuddydemo-v2.inspo_data.inspoextractholder`
+    WHERE page_id = @page_id
+    """
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter("page_id", "INT64", page_id)]
     )
+    video_ids = [row.video_id for row in bq_client.query(query, job_config=job_config).result()]
 
-    return signed_url
-    
-
-def fetch_files_and_notes():
-    """Fetches file names from Google Cloud Storage and their corresponding notes from BigQuery."""
-    
-    # Fetch file names from Google Cloud Storage
+    # Look up each video's object by its name prefix instead of listing the whole bucket
+    rows = []
     bucket = storage_client.bucket(bucket_name)
-    blobs = list(bucket.list_blobs())
+    for video_id in video_ids:
+        blob = next(iter(bucket.list_blobs(prefix=f"{video_id}.", max_results=1)), None)
+        if blob:
+            rows.append(manifest_row(page_id, video_id, blob.name, blob.content_type, blob.size, None, blob.time_created))
+    if rows:
+        add_to_manifest(rows)
+    return len(rows)
+
 
-    # Extract filenames (without extensions) from Cloud Storage
-    file_names = {blob.name.rsplit('.', 1)[0]: blob.public_url for blob in blobs}
+def upload_to_gcs(uploaded_file, file_type, page_id, inspiration_context):
+    """Uploads file to Google Cloud Storage under a content-derived video_id (reusing the existing one if the page already has this content) and returns a signed URL."""
+    # Uploads live in the session so a rerun resumes showing progress instead of starting over
+    uploads = st.session_state.setdefault("uploads", {})
+    upload = uploads.get(uploaded_file.file_id)
+
+    if upload is None:
+        content_hash = compute_content_hash(uploaded_file)
+        video_id = find_existing_video(page_id, content_hash)
+
+        if video_id:
+            # The same bytes were already ingested for this page, reuse that video instead of storing and analysing it again
+            blob = next(iter(storage_client.bucket(bucket_name).list_blobs(prefix=video_id, max_results=1)), None)
+            upload = {"video_id": video_id, "content_hash": content_hash, "blob_name": blob.name if blob else None, "job": None, "frames": None, "recorded": True, "manifested": True, "duplicate": True}
+        else:
+            # Name the video after its content, so a retried ingest of the same file lands on the same ID and object (video_id + file extension)
+            video_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{page_id}/{content_hash}"))
+            file_ext = uploaded_file.name.split('.')[-1]
+            blob_name = f"{video_id}.{file_ext}"
+            upload = {"video_id": video_id, "content_hash": content_hash, "blob_name": blob_name, "job": start_upload(uploaded_file, blob_name), "frames": None, "recorded": False, "manifested": False, "duplicate": False}
+        uploads[uploaded_file.file_id] = upload
+
+    if upload["job"] and not wait_for_upload(upload["job"]):
+        del uploads[uploaded_file.file_id]  # Let the user try again
+        return None
+
+    # Only record the video once its file is fully in storage
+    if not upload["recorded"]:
+        with st.spinner("Creating preview images..."):
+            upload["frames"] = extract_video_frames(uploaded_file, upload["video_id"])
+        insert_into_bq(page_id, upload["video_id"], inspiration_context, upload["content_hash"])
+        get_job_queue().submit(page_id, upload["video_id"], uploaded_file.name)
+        # Marked straight after the insert, so if the manifest write fails a rerun retries only that
+        upload["recorded"] = True
+
+    if not upload["manifested"]:
+        frames = upload["frames"]
+        add_to_manifest([manifest_row(page_id, upload["video_id"], upload["blob_name"], uploaded_file.type, upload["job"].total_bytes, upload["content_hash"], datetime.now(), frames["poster"], frames["thumbnail"])])
+        upload["manifested"] = True
+
+    if upload["duplicate"]:
+        st.info("This video was already uploaded for this page, so the existing copy and its analysis are reused.")
+
+    if not upload["blob_name"]:
+        return None
+
+    # Signed URL (valid for 24 hours), shared with the gallery through the cache
+    return get_signed_url_cache().get(upload["blob_name"])
     
-    # Query BigQuery to get matching notes
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_manifest_page(page_id, page_number, theme_filter="", style_filter="", page_size=GALLERY_PAGE_SIZE):
+    """Fetches one page of the page's manifest entries matching the filters with their analysis notes, newest first, and the total matching entry count."""
     query = f"""
-    SELECT video_id, key_themes, post_styles, notable_patterns, suggested_future_content
-    FROM `bizbuddydemo-v2.inspo_data.inspiration_analysis`
-    WHERE video_id IN UNNEST(@file_names)
+    SELECT
+        m.video_id,
+        m.blob_name,
+        m.poster_blob_name,
+        m.thumbnail_blob_name,
+        a.key_themes,
+        a.post_styles,
+        a.notable_patterns,
+        a.suggested_future_content,
+        COUNT(*) OVER () AS total_entries
+    FROM `{MANIFEST_TABLE_ID}` m
+    LEFT JOIN (
+        -- Only this page's videos are aggregated, so the work grows with the page, not with every tenant's history
+        SELECT
+            video_id,
+            ANY_VALUE(key_themes) AS key_themes,
+            ANY_VALUE(post_styles) AS post_styles,
+            ANY_VALUE(notable_patterns) AS notable_patterns,
+            ANY_VALUE(suggested_future_content) AS suggested_future_content
+        FROM `bizbuddydemo-v2.inspo_data.inspiration_analysis`
+        WHERE video_id IN (SELECT video_id FROM `{MANIFEST_TABLE_ID}` WHERE page_id = @page_id)
+        GROUP BY video_id
+    ) a ON a.video_id = m.video_id
+    WHERE m.page_id = @page_id
+        -- TO_JSON_STRING matches inside the notes whether they're stored as text or lists
+        AND (@theme_filter = '' OR LOWER(TO_JSON_STRING(a.key_themes)) LIKE CONCAT('%', LOWER(@theme_filter), '%'))
+        AND (@style_filter = '' OR LOWER(TO_JSON_STRING(a.post_styles)) LIKE CONCAT('%', LOWER(@style_filter), '%'))
+    ORDER BY m.uploaded_at DESC
+    LIMIT @page_size OFFSET @offset
     """
-    
-    query_params = [
-        bigquery.ArrayQueryParameter("file_names", "STRING", list(file_names.keys()))
-    ]
-    
+
     job_config = bigquery.QueryJobConfig(
-        query_parameters=query_params
+        query_parameters=[
+            bigquery.ScalarQueryParameter("page_id", "INT64", page_id),
+            bigquery.ScalarQueryParameter("theme_filter", "STRING", theme_filter),
+            bigquery.ScalarQueryParameter("style_filter", "STRING", style_filter),
+            bigquery.ScalarQueryParameter("page_size", "INT64", page_size),
+            bigquery.ScalarQueryParameter("offset", "INT64", (page_number - 1) * page_size),
+        ]
     )
-    
-    query_job = bq_client.query(query, job_config=job_config)
-    results = query_job.result()
-
-    # Store results in a dictionary
-    file_data = {}
-    for row in results:
-        file_data[row.video_id] = {
-            "public_url": file_names.get(row.video_id, ""),
+
+    rows = list(bq_client.query(query, job_config=job_config).result())
+    total_entries = rows[0].total_entries if rows else 0
+
+    # Store results in a list, keeping the gallery order
+    entries = [
+        {
+            "video_id": row.video_id,
+            "blob_name": row.blob_name,
+            "poster_blob_name": row.poster_blob_name,
+            "thumbnail_blob_name": row.thumbnail_blob_name,
             "key_themes": row.key_themes,
             "post_styles": row.post_styles,
             "notable_patterns": row.notable_patterns,
             "suggested_future_content": row.suggested_future_content
         }
-    
-    return file_data
+        for row in rows
+    ]
+
+    return entries, total_entries
+
 
+def reset_gallery_page():
+    st.session_state["gallery_page"] = 1
 
+
+@st.fragment
 def display_uploaded_files_and_notes():
-    """Displays files and their corresponding notes in a two-column layout (videos on left, notes on right)."""
-    
-    file_data = fetch_files_and_notes()
+    """Displays one page of the page's files matching the filters and their notes in a two-column layout (videos on left, notes on right). Paging, filtering and playing only rerun this fragment."""
+    st.subheader("📂 Uploaded Inspirations and Analysis")
+
+    filter_col1, filter_col2 = st.columns(2)
+    with filter_col1:
+        theme_filter = st.text_input("Filter by key theme", key="theme_filter", on_change=reset_gallery_page).strip()
+    with filter_col2:
+        style_filter = st.text_input("Filter by post style", key="style_filter", on_change=reset_gallery_page).strip()
+    filtered = bool(theme_filter or style_filter)
+
+    page_number = st.session_state.get("gallery_page", 1)
+    entries, total_entries = fetch_manifest_page(PAGE_ID, page_number, theme_filter, style_filter)
+
+    # The page number can outlive the page it pointed at, e.g. after the manifest shrank
+    if not entries and page_number > 1:
+        page_number = st.session_state["gallery_page"] = 1
+        entries, total_entries = fetch_manifest_page(PAGE_ID, page_number, theme_filter, style_filter)
 
-    if file_data:
-        st.subheader("📂 Uploaded Inspirations and Analysis")
+    # Pages with uploads from before the manifest existed get them added once
+    if not total_entries and not filtered and page_number == 1 and backfill_manifest(PAGE_ID):
+        entries, total_entries = fetch_manifest_page(PAGE_ID, page_number)
+
+    if entries:
+        st.caption(f"{total_entries} inspiration{'s' if total_entries != 1 else ''}{' matching the filters' if filtered else ''}")
 
         # Define standard size for videos
         video_width = 500  # Set desired width
         video_height = 300  # Set desired height
 
-        for file_name, data in file_data.items():
+        signed_urls = get_signed_url_cache()
+
+        playing = st.session_state.setdefault("playing_videos", set())
+
+        for data in entries:
             col1, col2 = st.columns([1, 1])  # Two equal-width columns
 
             with col1:
-                # Embed the video in a standardized-size container using HTML
-                st.markdown(
-                    f'''
-                    <div style="width:{video_width}px; height:{video_height}px; overflow:hidden;">
-                        <video width="{video_width}" height="{video_height}" controls>
-                            <source src="{data['public_url']}" type="video/mp4">
-                            Your browser does not support the video tag.
-                        </video>
-                    </div>
-                    ''',
-                    unsafe_allow_html=True
-                )
+                if data["thumbnail_blob_name"] and data["video_id"] not in playing:
+                    # Show the lightweight thumbnail and only load the video once it's asked for
+                    st.image(signed_urls.get(data["thumbnail_blob_name"]), width=video_width)
+                    if st.button("▶️ Play", key=f"play_{data['video_id']}"):
+                        playing.add(data["video_id"])
+                        st.rerun(scope="fragment")
+                else:
+                    # The poster stands in while the video loads, and preload="none" stops the browser
+                    # fetching anything for videos without preview images until they're played
+                    poster = signed_urls.get(data["poster_blob_name"]) if data["poster_blob_name"] else ""
+                    autoplay = "autoplay" if data["video_id"] in playing else ""
+
+                    # Embed the video in a standardized-size container using HTML
+                    st.markdown(
+                        f'''
+                        <div style="width:{video_width}px; height:{video_height}px; overflow:hidden;">
+                            <video width="{video_width}" height="{video_height}" controls preload="none" poster="{poster}" {autoplay}>
+                                <source src="{signed_urls.get(data['blob_name'])}" type="video/mp4">
+                                Your browser does not support the video tag.
+                            </video>
+                        </div>
+                        ''',
+                        unsafe_allow_html=True
+                    )
 
             with col2:
                 st.write("### Notes")  # Title for clarity
-                st.write("**Key Themes:**", data["key_themes"])
-                st.write("**Post Styles:**", data["post_styles"])
-                st.write("**Notable Patterns:**", data["notable_patterns"])
-                st.write("**Suggested Future Content:**", data["suggested_future_content"])
+                if data["key_themes"] is None:
+                    st.write("Analysis pending, check back soon.")
+                else:
+                    st.write("**Key Themes:**", data["key_themes"])
+                    st.write("**Post Styles:**", data["post_styles"])
+                    st.write("**Notable Patterns:**", data["notable_patterns"])
+                    st.write("**Suggested Future Content:**", data["suggested_future_content"])
             st.divider()
+    elif filtered:
+        st.write("No inspiration matches these filters.")
     else:
-        st.write("No files found in storage or no matching notes in BigQuery.")
+        st.write("No inspiration uploaded for this page yet.")
+
+    page_count = max(1, -(-total_entries // GALLERY_PAGE_SIZE))
+    if page_count > 1:
+        st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, step=1, key="gallery_page")
+
+
+@st.fragment(run_every=JOB_STATUS_POLL_SECONDS)
+def display_processing_status():
+    """Shows where each recent upload is in the pipeline. Only this fragment reruns while polling."""
+    jobs = get_job_queue().jobs(PAGE_ID)
+    if not jobs:
+        return
+
+    st.subheader("⏳ Processing Status")
+    for job in jobs:
+        line = f"{JOB_STATE_ICONS[job['state']]} **{job['file_name']}**: {job['state']}"
+        if job["error"]:
+            line += f" ({job['error']})"
+        st.write(line)
+        if job["state"] == "failed" and st.button("Check again", key=f"retry_{job['video_id']}"):
+            get_job_queue().retry(job["video_id"])
+            st.rerun(scope="fragment")
+
+    # Rerun the whole page once when an analysis finishes, so the gallery shows its notes
+    seen_done = st.session_state.setdefault("seen_done_jobs", set())
+    newly_done = {job["video_id"] for job in jobs if job["state"] == "done"} - seen_done
+    if newly_done:
+        seen_done.update(newly_done)
+        st.rerun()
 
 
 def main():
@@ -220,15 +635,17 @@ def main():
                 
                 if page_id and inspiration_context:
                     public_url = upload_to_gcs(uploaded_file, file_type, page_id, inspiration_context)
-                    st.success(f"Uploaded Video: {uploaded_file.name}")
-                    st.markdown(f"[View Video in Cloud Storage]({public_url})")
+                    if public_url:
+                        st.success(f"Uploaded Video: {uploaded_file.name}")
+                        st.markdown(f"[View Video in Cloud Storage]({public_url})")
                 else:
                     st.warning("Please enter Page ID and Inspiration Context before uploading.")
             
             else:
                 st.warning(f"Unsupported file type: {uploaded_file.type}")
 
-    # Display uploaded files and notes
+    # Display processing status, then uploaded files and notes
+    display_processing_status()
     display_uploaded_files_and_notes()
 
 
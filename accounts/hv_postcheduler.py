@@ -2,10 +2,23 @@ import streamlit as st
 from google.cloud import bigquery
 from google.oauth2 import service_account
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import openai
 import json
+import os
+import threading
+import uuid
+import zlib
+import numpy as np
 import re
+import sys
+
+# Shared modules live at the repo root, one level above this page
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_gateway import LLMGateway, LLMResponseCache
+from mutation_queue import MutationQueue, STORED_FIELDS
+from slot_allocator import SlotAllocator
 
 st.set_page_config(page_title="Post Scheduler", layout="wide", page_icon = "🗓️")
 
@@ -45,94 +58,477 @@ credentials = service_account.Credentials.from_service_account_info(
 # Load BQ Client
 bq_client = bigquery.Client(credentials=credentials, project=PROJECT_ID)
 
-openai.api_key = st.secrets["openai"]["api_key"]
+openai_api_key = st.secrets["openai"]["api_key"]
+
+@st.cache_resource
+def get_llm_gateway(api_key):
+    return LLMGateway(api_key, cache=LLMResponseCache())
 
 # Initialize OpenAI client
-client = openai
+client = get_llm_gateway(openai_api_key)
 
+# Fields every generated idea must have
+IDEA_FIELDS = ["post_summary", "caption", "post_type", "themes", "tone"]
 
-def fetch_latest_date(page_id):
-    query = """
-        SELECT MAX(date) as latest_date
-        FROM `bizbuddydemo-v2.strategy_data.postideas`
-        WHERE page_id = @page_id
+class IdeaStore:
     """
-    
-    query_job = bq_client.query(
-        query, 
-        job_config=bigquery.QueryJobConfig(
-            query_parameters=[bigquery.ScalarQueryParameter("page_id", "INT64", page_id)]
-        )
+    In-memory snapshot of each page's post ideas. A page is reloaded from
+    BigQuery only when its version (latest update time and idea count)
+    changes, and flushed edits from this app are applied to the snapshot
+    directly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = {}
+
+    def get(self, page_id, version, load):
+        """Return the page's ideas, calling load(page_id) when the snapshot is missing or out of date."""
+        with self._lock:
+            cached = self._pages.get(page_id)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        posts = load(page_id)
+        with self._lock:
+            self._pages[page_id] = (version, posts)
+        return posts
+
+    def apply(self, page_id, changes, versions):
+        """
+        Fold edits that were just written to BigQuery into the page's snapshot.
+
+        versions is the page's version from just before and just after the write. The
+        snapshot takes the new version only if it was current before the write, otherwise
+        someone else changed the page too and the next version check reloads it.
+        """
+        previous, current = versions
+        with self._lock:
+            if page_id in self._pages:
+                version, posts = self._pages[page_id]
+                self._pages[page_id] = (current if version == previous else version, apply_pending_mutations(posts, changes))
+
+@st.cache_resource
+def get_idea_store():
+    return IdeaStore()
+
+# Function to keep the snapshot and its version check in step with this app's own writes
+def on_ideas_flushed(page_id, changes, versions):
+    get_idea_store().apply(page_id, changes, versions)
+    # The cached version predates the write, drop it so the next check sees the new one
+    fetch_ideas_version.clear()
+
+@st.cache_resource
+def get_mutation_queue():
+    return MutationQueue(bq_client, on_flush=on_ideas_flushed)
+
+# Post ideas and their pending edits, shared by every session of this app
+idea_store = get_idea_store()
+mutation_queue = get_mutation_queue()
+
+# Function to give new ideas dates and times from the page's free slots
+def schedule_post_ideas(post_df, posts, model):
+    """
+    Give new ideas a date and time around the page's already scheduled posts.
+
+    Args:
+        post_df (pd.DataFrame): New ideas to schedule.
+        posts (pd.DataFrame): The page's current ideas, from the idea store.
+        model (dict): The page's engagement model, or None.
+    """
+    allocator = SlotAllocator(posts["date"] if not posts.empty else [], model.get("slot_reach") if model else None)
+    slots = allocator.allocate(len(post_df))
+    post_df["date"] = [date for date, _ in slots]
+    post_df["post_time"] = [time_of_day for _, time_of_day in slots]
+    return post_df
+
+# Near-duplicate detection for generated ideas
+MINHASH_PERMUTATIONS = 64
+SHINGLE_SIZE = 3  # words per shingle
+DUPLICATE_THRESHOLD = 0.5  # estimated Jaccard similarity at which an idea counts as a repeat
+DUPLICATE_MAX_ROUNDS = 2  # extra generation rounds to replace rejected ideas
+MERSENNE_PRIME = (1 << 61) - 1
+
+class IdeaSimilarityIndex:
+    """
+    MinHash index over word shingles of post ideas, used to reject generated
+    ideas that repeat an existing one without asking the model to compare.
+    """
+
+    def __init__(self, num_perm=MINHASH_PERMUTATIONS, threshold=DUPLICATE_THRESHOLD, seed=7):
+        rng = np.random.default_rng(seed)
+        # Hash coefficients stay below 2**32 so a * crc32 + b never overflows uint64
+        self._a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+        self.threshold = threshold
+        self._signatures = np.empty((0, num_perm), dtype=np.uint64)
+
+    @staticmethod
+    def shingles(text):
+        words = re.findall(r"[a-z0-9']+", str(text).lower())
+        if len(words) <= SHINGLE_SIZE:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+    def signature(self, text):
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.array([zlib.crc32(shingle.encode("utf-8")) for shingle in shingles], dtype=np.uint64)
+        return ((np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME).min(axis=0)
+
+    def similarity(self, text):
+        """Highest estimated Jaccard similarity between the text and any indexed idea."""
+        signature = self.signature(text)
+        if signature is None or not len(self._signatures):
+            return 0.0
+        return float((self._signatures == signature).mean(axis=1).max())
+
+    def is_duplicate(self, text):
+        return self.similarity(text) >= self.threshold
+
+    def add(self, text):
+        signature = self.signature(text)
+        if signature is not None:
+            self._signatures = np.vstack([self._signatures, signature])
+
+# Function to get the text two ideas are compared on
+def idea_text(post):
+    return f"{post.get('post_summary') or ''} {post.get('caption') or ''}"
+
+def build_idea_index(posts):
+    """Index the page's existing ideas for near-duplicate checks."""
+    index = IdeaSimilarityIndex()
+    for post in posts.to_dict("records"):
+        index.add(idea_text(post))
+    return index
+
+def drop_duplicate_ideas(idea_df, index):
+    """
+    Drop generated ideas that repeat an indexed idea or an earlier idea in the same batch.
+
+    Returns:
+        tuple: (the kept ideas, number of ideas dropped)
+    """
+    keep = []
+    for post in idea_df.to_dict("records"):
+        text = idea_text(post)
+        is_new = not index.is_duplicate(text)
+        if is_new:
+            index.add(text)
+        keep.append(is_new)
+
+    return idea_df[keep].reset_index(drop=True), keep.count(False)
+
+def generate_unique_post_ideas(strategy, past_posts, account_inspiration, account_insights, user_context, count, index):
+    """
+    Generate post ideas, regenerating any that are near-duplicates of existing ones.
+
+    Args:
+        count (int): Number of post ideas wanted.
+        index (IdeaSimilarityIndex): The page's existing ideas.
+
+    Returns:
+        tuple: (pd.DataFrame of unique ideas, number of ideas rejected as duplicates)
+    """
+    batches, rejected, needed = [], 0, count
+    for _ in range(1 + DUPLICATE_MAX_ROUNDS):
+        if needed == 1:
+            idea_df = generate_post_idea(strategy, past_posts, account_inspiration, account_insights, user_context)
+        else:
+            idea_df = generate_post_ideas_batch(strategy, past_posts, account_inspiration, account_insights, user_context, needed)
+        if idea_df.empty:
+            break
+
+        idea_df, dropped = drop_duplicate_ideas(idea_df, index)
+        rejected += dropped
+        batches.append(idea_df)
+        needed -= len(idea_df)
+        if needed <= 0:
+            break
+
+    if not batches:
+        return pd.DataFrame(), rejected
+
+    return pd.concat(batches, ignore_index=True), rejected
+
+# Engagement scorer trained offline by engagement_model.py
+ENGAGEMENT_MODEL_DIR = "engagement_models"
+OVERGENERATE_FACTOR = 2  # candidates generated per idea kept when a scorer is available
+MAX_IDEAS_PER_REQUEST = 30
+
+class EngagementScorer:
+    """
+    Linear model of log reach over idea features (theme, post type and caption
+    length), used to rank candidate ideas locally.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def _theme_weight(self, themes):
+        # Ideas carry free-text themes, so match them against the trained theme names
+        theme_model = self.model["categorical"]["main_theme"]
+        text = str(themes).lower()
+        matches = [weight for level, weight in theme_model["weights"].items() if level.lower() in text]
+        return sum(matches) / len(matches) if matches else theme_model["default"]
+
+    def _level_weight(self, feature, value):
+        feature_model = self.model["categorical"][feature]
+        return feature_model["weights"].get(value, feature_model["default"])
+
+    def _numeric_weight(self, feature, value):
+        feature_model = self.model["numeric"][feature]
+        if value is None or pd.isna(value):
+            return 0.0
+        return feature_model["weight"] * (value - feature_model["mean"]) / feature_model["std"]
+
+    def score(self, idea_df):
+        """Predicted reach for each idea."""
+        log_reach = [
+            self.model["intercept"]
+            + self._theme_weight(post.get("themes"))
+            + self._level_weight("post_type", post.get("post_type"))
+            + self._numeric_weight("caption_length", len(post.get("caption") or ""))
+            for post in idea_df.to_dict("records")
+        ]
+        return np.expm1(np.array(log_reach))
+
+@st.cache_resource(ttl=3600)
+def load_engagement_model(page_id):
+    """Load the page's trained engagement model, or None if none has been trained for it yet."""
+    path = os.path.join(ENGAGEMENT_MODEL_DIR, f"{page_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+def rank_post_ideas(post_df, scorer, count):
+    """
+    Keep the ideas with the highest predicted reach.
+
+    Args:
+        post_df (pd.DataFrame): Candidate ideas.
+        scorer (EngagementScorer): The page's engagement scorer.
+        count (int): Number of ideas to keep.
+
+    Returns:
+        pd.DataFrame: The top ideas, best first.
+    """
+    post_df = post_df.assign(predicted_reach=scorer.score(post_df))
+    post_df = post_df.sort_values("predicted_reach", ascending=False).head(count)
+    return post_df.drop(columns="predicted_reach").reset_index(drop=True)
+
+# Schema generated ideas are validated against
+POST_TYPES = ["Reel", "Story", "Static Post"]
+MAX_CAPTION_LENGTH = 2200  # Instagram's caption limit
+IDEA_REPAIR_ATTEMPTS = 2
+
+def coerce_text(value):
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return value.strip()
+
+def coerce_caption(value):
+    caption = coerce_text(value)
+    return caption if caption and len(caption) <= MAX_CAPTION_LENGTH else None
+
+def coerce_post_type(value):
+    text = str(value or "").lower()
+    if "reel" in text or "video" in text:
+        return "Reel"
+    if "story" in text:
+        return "Story"
+    if any(word in text for word in ("static", "image", "photo", "carousel", "post")):
+        return "Static Post"
+    return None
+
+def coerce_list(value):
+    # Models return lists, comma-separated strings or (for stored ideas) JSON-encoded lists
+    if isinstance(value, str):
+        try:
+            value = json.loads(value) if value.strip().startswith("[") else value.split(",")
+        except json.JSONDecodeError:
+            value = value.strip().strip("[]").split(",")
+    if not isinstance(value, list):
+        return None
+    items = [str(item).strip().strip("\"'") for item in value if str(item).strip()]
+    return items or None
+
+# field -> (coercer returning the cleaned value or None, description used in prompts)
+IDEA_SCHEMA = {
+    "post_summary": (coerce_text, "a one-sentence summary of the post"),
+    "caption": (coerce_caption, f"the full caption, at most {MAX_CAPTION_LENGTH} characters"),
+    "post_type": (coerce_post_type, f"one of {', '.join(POST_TYPES)}"),
+    "themes": (coerce_list, "a list of short themes"),
+    "tone": (coerce_list, "a list of tone words"),
+}
+
+def describe_idea_schema(fields=IDEA_FIELDS):
+    return "".join(f"- **{field}**: {IDEA_SCHEMA[field][1]}\n" for field in fields)
+
+def validate_idea(raw):
+    """
+    Coerce a generated idea onto the idea schema.
+
+    Returns:
+        tuple: (the cleaned idea, list of fields that are missing or invalid)
+    """
+    raw = raw if isinstance(raw, dict) else {}
+    idea, failed = {}, []
+    for field, (coerce, _) in IDEA_SCHEMA.items():
+        value = coerce(raw.get(field))
+        if value is None:
+            failed.append(field)
+        else:
+            idea[field] = value
+    return idea, failed
+
+class IdeaValidationStats:
+    """Process-wide counts of how generated ideas fared against the schema."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"ideas": 0, "invalid": 0, "repaired": 0, "reverted": 0, "dropped": 0, "unparseable": 0}
+
+    def record(self, **counts):
+        with self._lock:
+            for name, count in counts.items():
+                self.counts[name] += count
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+@st.cache_resource
+def get_validation_stats():
+    return IdeaValidationStats()
+
+validation_stats = get_validation_stats()
+
+def build_repair_request(idea, failed):
+    """Chat request asking only for the fields of an idea that failed validation."""
+    prompt = (
+        f"Here is an Instagram post idea with some fields missing or invalid:\n{json.dumps(idea)}\n\n"
+        f"Provide values for these fields only:\n{describe_idea_schema(failed)}"
+        "Keep them consistent with the rest of the idea. Return a JSON object with exactly those keys."
     )
+    return {
+        "model": "gpt-4o-mini",
+        "temperature": 0.7,
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": "You are a social media manager completing a post idea."},
+            {"role": "user", "content": prompt}
+        ],
+    }
 
-    result_df = query_job.to_dataframe()
+def repair_ideas(broken):
+    """
+    Re-request only the failing fields of each broken idea, concurrently.
 
-    # Handle case where there are no posts for the given page_id
-    if result_df.empty or pd.isna(result_df.iloc[0]["latest_date"]):
-        return pd.Timestamp(datetime.now().date() + timedelta(days=3))  # Return as datetime64[ns]
+    Args:
+        broken (list): (cleaned idea, failing fields) pairs from validate_idea.
+
+    Returns:
+        tuple: (repaired ideas, pairs that still fail after IDEA_REPAIR_ATTEMPTS)
+    """
+    repaired = []
+    for _ in range(IDEA_REPAIR_ATTEMPTS):
+        if not broken:
+            break
+        # Uncached, so a second attempt asks again instead of getting the failed answer back
+        responses = client.create_many([build_repair_request(idea, failed) for idea, failed in broken], use_cache=False)
+
+        still_broken = []
+        for (idea, failed), response in zip(broken, responses):
+            try:
+                patch = json.loads(response.choices[0].message.content)
+            except (AttributeError, TypeError, json.JSONDecodeError):
+                # The request itself failed (create_many returns the exception), had no content or wasn't JSON
+                still_broken.append((idea, failed))
+                continue
+            if not isinstance(patch, dict):
+                still_broken.append((idea, failed))
+                continue
+            cleaned, failed_now = validate_idea({**idea, **{field: patch.get(field) for field in failed}})
+            if failed_now:
+                still_broken.append((cleaned, failed_now))
+            else:
+                repaired.append(cleaned)
+        broken = still_broken
+
+    return repaired, broken
+
+def parse_generated_ideas(raw_ideas):
+    """
+    Validate generated ideas, repairing the failing fields of any that don't match the schema.
 
-    latest_date = result_df.iloc[0]["latest_date"]
+    Returns:
+        pd.DataFrame: One row per valid idea with the IDEA_FIELDS columns. Ideas that can't be repaired are dropped.
+    """
+    valid, broken = [], []
+    for raw in raw_ideas:
+        idea, failed = validate_idea(raw)
+        if failed:
+            broken.append((idea, failed))
+        else:
+            valid.append(idea)
 
-    # ✅ Convert latest_date to datetime if it's a string
-    if isinstance(latest_date, str):
-        latest_date = pd.to_datetime(latest_date).date()  # Convert to datetime.date
+    repaired, dropped = repair_ideas(broken)
+    validation_stats.record(ideas=len(raw_ideas), invalid=len(broken), repaired=len(repaired), dropped=len(dropped))
 
-    return pd.Timestamp(latest_date) + pd.Timedelta(days=3)
+    return pd.DataFrame(valid + repaired, columns=IDEA_FIELDS)
 
-def generate_post_idea(strategy, past_posts, account_inspiration, past_post_ideas, account_insights, user_context):
-    
+def build_context_prompt(strategy, past_posts, account_inspiration, account_insights, user_context):
     prompt = (
         f"You are a social media manager creating a post for an Instagram account based on the following context:\n\n"
         f"** Here is their Social Media Strategy:** {strategy}\n\n"
         f"** Here is past posts themes and types. Try to recommend similar ideas but avoid direct overlap:**\n{past_posts}\n\n"
         f"** Here is ideas about post structure / ideas that the user finds inspirational, factor this in:**\n{account_inspiration}\n\n"
-        f"** Here are the Past Post Ideas, don't recommend the same things:**\n{past_post_ideas}\n\n"
         f"** Here is some Account Insights about what types of ideas and concepts have worked well for this account in the past. This should be weighted heavily as you decide which post to suggest:**\n{account_insights}\n\n"
     )
     
     if user_context:
         prompt += f"**Additional user-provided context for this post:** {user_context}\n\n"
+
+    return prompt
+
+def generate_post_idea(strategy, past_posts, account_inspiration, account_insights, user_context):
+    
+    prompt = build_context_prompt(strategy, past_posts, account_inspiration, account_insights, user_context)
     
     prompt += (
         "**Generate 1 new post idea** based on this context. Ensure the idea aligns with the strategy but also introduces a mix of concepts.\n"
         "Each idea should include:\n"
-        "- **post_summary** - (e.g., Summarize this post)\n"
-        "- **caption**\n"
-        "- **post_type** (e.g., Reel, Story, Static Post)\n"
-        "- **themes**\n"
-        "- **tone**\n"
+        f"{describe_idea_schema()}"
         "**Output the response as a JSON object** with the **exact** keys: 'post_summary', 'caption', 'post_type', 'themes', 'tone'."
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=1.1,  # 🔥 Increased for more variation 
-        messages=[
-            {"role": "system", "content": "You are an experienced social media manager with expertise in creating engaging content."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-
-    idea_json = response.choices[0].message.content.strip()
-
-    # ✅ Extract only the JSON using regex
-    json_match = re.search(r"\{.*\}", idea_json, re.DOTALL)
-    if json_match:
-        idea_json = json_match.group(0)
+    try:
+        response = client.create(
+            use_cache=False,  # Creative call, new ideas should differ every time
+            model="gpt-4o-mini",
+            temperature=1.1,  # 🔥 Increased for more variation 
+            response_format={"type": "json_object"},  # Structured output, no regex extraction needed
+            messages=[
+                {"role": "system", "content": "You are an experienced social media manager with expertise in creating engaging content."},
+                {"role": "user", "content": prompt}
+            ]
+        )
+    except openai.OpenAIError as e:
+        st.error(f"The AI service is unavailable right now, please try again shortly.\nError: {e}")
+        return pd.DataFrame()
 
-    # ✅ Validate JSON before loading
     try:
-        idea_dict = json.loads(idea_json)  # Convert JSON string to dictionary
-        idea_df = pd.DataFrame([idea_dict])  # Convert dictionary to DataFrame
-    except json.JSONDecodeError as e:
+        idea_dict = json.loads(response.choices[0].message.content)
+    except (json.JSONDecodeError, TypeError) as e:
+        validation_stats.record(unparseable=1)
         st.error(f"Failed to parse AI-generated post idea. Response was not valid JSON.\nError: {e}")
         return pd.DataFrame()  # Return an empty DataFrame to prevent breaking the app
 
-    # ✅ Assign date directly from fetch_latest_date(), ensuring it's datetime64[ns]
-    idea_df["date"] = fetch_latest_date(PAGE_ID)
-    
-    # ✅ Convert 'date' to string if required by BigQuery
-    idea_df["date"] = idea_df["date"].astype(str)
+    # ✅ Validate against the idea schema, repairing only the fields that fail
+    idea_df = parse_generated_ideas([idea_dict])
 
     # ✅ Ensure BigQuery-compatible types
     idea_df["source"] = "ChatGPT"
@@ -141,17 +537,60 @@ def generate_post_idea(strategy, past_posts, account_inspiration, past_post_idea
     return idea_df
 
 
-def tweak_post_idea(existing_post, user_tweaks):
+def generate_post_ideas_batch(strategy, past_posts, account_inspiration, account_insights, user_context, count):
     """
-    Generate a new version of a post idea based on user-provided tweaks.
+    Generate several post ideas with a single LLM request.
 
     Args:
-        existing_post (dict): The original post data including 'post_summary', 'caption', 'post_type', 'themes', and 'tone'.
-        user_tweaks (str): The modifications the user wants to make to the post.
+        count (int): Number of post ideas to generate.
 
     Returns:
-        dict: A new post idea with the applied tweaks.
+        pd.DataFrame: One row per idea, not yet scheduled.
     """
+    prompt = build_context_prompt(strategy, past_posts, account_inspiration, account_insights, user_context)
+
+    prompt += (
+        f"**Generate {count} new post ideas** based on this context. Ensure the ideas align with the strategy, introduce a mix of concepts and are distinct from each other.\n"
+        "Each idea should include:\n"
+        f"{describe_idea_schema()}"
+        "**Output the response as a JSON object** with a single key 'ideas' holding a list of ideas, each with the **exact** keys: 'post_summary', 'caption', 'post_type', 'themes', 'tone'."
+    )
+
+    try:
+        response = client.create(
+            use_cache=False,  # Creative call, new ideas should differ every time
+            model="gpt-4o-mini",
+            temperature=1.1,
+            response_format={"type": "json_object"},  # Structured output, no regex extraction needed
+            messages=[
+                {"role": "system", "content": "You are an experienced social media manager with expertise in creating engaging content."},
+                {"role": "user", "content": prompt}
+            ]
+        )
+    except openai.OpenAIError as e:
+        st.error(f"The AI service is unavailable right now, please try again shortly.\nError: {e}")
+        return pd.DataFrame()
+
+    try:
+        ideas = json.loads(response.choices[0].message.content)["ideas"]
+        if not isinstance(ideas, list):
+            raise TypeError("'ideas' is not a list")
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        validation_stats.record(unparseable=1)
+        st.error(f"Failed to parse AI-generated post ideas. Response was not in the expected format.\nError: {e}")
+        return pd.DataFrame()
+
+    # Validate each idea against the schema, repairing only the fields that fail
+    idea_df = parse_generated_ideas(ideas[:count])
+
+    idea_df["source"] = "ChatGPT"
+    idea_df["page_id"] = PAGE_ID
+
+    return idea_df
+
+
+def build_tweak_request(existing_post, user_tweaks):
+    """Chat request for a tweaked version of one post idea."""
     prompt = (
         f"You are a social media manager improving an existing Instagram post based on user feedback.\n\n"
         f"**Here is the original post:**\n"
@@ -162,65 +601,90 @@ def tweak_post_idea(existing_post, user_tweaks):
         f"Tone: {existing_post['tone']}\n\n"
         f"**User Feedback on Changes:** {user_tweaks}\n\n"
         "Please generate an improved version of this post while retaining its core structure. Ensure the updated post aligns with the requested tweaks.\n"
+        f"Each field must be:\n{describe_idea_schema()}"
         "Return the output as a JSON object with the exact keys: 'post_summary', 'caption', 'post_type', 'themes', 'tone'."
     )
-
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=1.0,  # Keeps responses creative but consistent
-        messages=[
+    return {
+        "model": "gpt-4o-mini",
+        "temperature": 1.0,  # Keeps responses creative but consistent
+        "response_format": {"type": "json_object"},
+        "messages": [
             {"role": "system", "content": "You are a social media manager refining an Instagram post based on user input."},
             {"role": "user", "content": prompt}
-        ]
-    )
+        ],
+    }
+
+def parse_tweak_response(existing_post, content):
+    """
+    Validate a tweaked post. Raises json.JSONDecodeError if the response isn't JSON, or TypeError if it had no content.
+
+    Returns:
+        dict: The tweaked post with IDEA_FIELDS.
+    """
+    try:
+        new_post = json.loads(content)
+    except (TypeError, json.JSONDecodeError):
+        validation_stats.record(unparseable=1)
+        raise
+
+    # ✅ Fields the tweak got wrong keep their original value instead of costing another request
+    new_post, failed = validate_idea(new_post)
+    validation_stats.record(ideas=1, invalid=int(bool(failed)), reverted=int(bool(failed)))
+    original, _ = validate_idea(existing_post)
+    for field in failed:
+        new_post[field] = original.get(field, existing_post.get(field))
 
-    idea_json = response.choices[0].message.content.strip()
+    return new_post
 
+def tweak_post_idea(existing_post, user_tweaks):
+    """
+    Generate a new version of a post idea based on user-provided tweaks.
 
-    # ✅ Extract only the JSON using regex
-    json_match = re.search(r"\{.*\}", idea_json, re.DOTALL)
-    if json_match:
-        idea_json = json_match.group(0)
+    Args:
+        existing_post (dict): The original post data including 'post_summary', 'caption', 'post_type', 'themes', and 'tone'.
+        user_tweaks (str): The modifications the user wants to make to the post.
+
+    Returns:
+        dict: A new post idea with the applied tweaks.
+    """
+    try:
+        # Uncached, so asking for the same tweak again gives a fresh answer
+        response = client.create(use_cache=False, **build_tweak_request(existing_post, user_tweaks))
+    except openai.OpenAIError as e:
+        st.error(f"The AI service is unavailable right now, please try again shortly.\nError: {e}")
+        return None
 
-    # ✅ Validate JSON before loading
     try:
-        new_post = json.loads(idea_json)
-        return new_post  # Return updated post idea
-    except json.JSONDecodeError as e:
+        return parse_tweak_response(existing_post, response.choices[0].message.content)  # Return updated post idea
+    except (TypeError, json.JSONDecodeError) as e:
         st.error(f"Failed to parse AI-generated post idea. Response was not valid JSON.\nError: {e}")
         return None
 
+def tweak_post_ideas(posts, user_tweaks):
+    """
+    Apply the same tweak to several posts in one concurrent pass through the LLM gateway.
 
-# Get past post ideas
-def fetch_past_post_ideas(page_id):
-    query = f"""
-        SELECT post_summary
-        FROM `bizbuddydemo-v2.strategy_data.postideas` 
-        WHERE page_id = @page_id 
-        ORDER BY date 
-        LIMIT 5
+    Args:
+        posts (list): The posts to tweak, as dicts including 'idea_id'.
+        user_tweaks (str): The modifications the user wants to make to every post.
+
+    Returns:
+        tuple: (list of (existing post, tweaked post) pairs, number of posts that could not be tweaked)
     """
-    
-    query_job = bq_client.query(
-        query, 
-        job_config=bigquery.QueryJobConfig(
-            query_parameters=[bigquery.ScalarQueryParameter("page_id", "INT64", page_id)]
-        )
-    )
-    
-    results_df = query_job.to_dataframe()
+    responses = client.create_many([build_tweak_request(post, user_tweaks) for post in posts], use_cache=False)
 
-    if results_df.empty:
-        return "No past posts found."
+    tweaked, failed = [], 0
+    for post, response in zip(posts, responses):
+        if isinstance(response, Exception):
+            failed += 1
+            continue
+        try:
+            tweaked.append((post, parse_tweak_response(post, response.choices[0].message.content)))
+        except (TypeError, json.JSONDecodeError):
+            failed += 1
+
+    return tweaked, failed
 
-    # Format the output as a numbered list
-    past_posts_list = [
-        f"{i+1}. {row['post_summary']}"
-        for i, row in results_df.iterrows()
-    ]
-    
-    return "\n".join(past_posts_list)
 
 # Get account inspo
 def fetch_account_inspiration(page_id):
@@ -297,6 +761,24 @@ def fetch_account_insights(page_id):
 
     return results_df.iloc[0]["notes"]
 
+# Gather all context for the idea generator
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_generation_context(page_id):
+    """
+    Run the three context queries concurrently and cache the result per page.
+
+    Only called when a post is generated, so plain page loads don't query these tables.
+
+    Returns:
+        tuple: (account_inspiration, past_posts, account_insights)
+    """
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        account_inspiration = executor.submit(fetch_account_inspiration, page_id)
+        past_posts = executor.submit(fetch_past_post_concepts, page_id)
+        account_insights = executor.submit(fetch_account_insights, page_id)
+
+        return account_inspiration.result(), past_posts.result(), account_insights.result()
+
 # Function to manually add a post idea in the Streamlit app
 def manually_add_post():
     """
@@ -334,43 +816,48 @@ def manually_add_post():
         except Exception as e:
             st.error(f"Failed to add post: {e}")
 
+# Function to convert an idea into the string columns stored in postideas
+def to_stored_row(post):
+    row = {}
+    for field in STORED_FIELDS:
+        value = post.get(field)
+        if isinstance(value, list):
+            value = json.dumps(value)
+        elif value is not None and not pd.isna(value):
+            value = str(value)
+        else:
+            value = None
+        row[field] = value
+    return row
+
 def add_post_to_bigquery(post_df):
-    table_id = "bizbuddydemo-v2.strategy_data.postideas"
+    """
+    Queue new post ideas for insertion. They show up in the schedule right away
+    and are written to BigQuery by the next flush of the mutation queue.
 
+    Args:
+        post_df (pd.DataFrame): One row per post idea.
+    """
     # ✅ Ensure 'date' is in string format before uploading
     post_df["date"] = post_df["date"].astype(str)
 
-    # ✅ Convert list-type columns to JSON-serializable strings
-    for column in post_df.columns:
-        if post_df[column].apply(lambda x: isinstance(x, list)).any():
-            post_df[column] = post_df[column].apply(json.dumps)
-
-    # Insert the DataFrame row into BigQuery
-    job = bq_client.load_table_from_dataframe(post_df, table_id)
-    job.result()  # Wait for the load job to complete
+    # ✅ Give every new idea a stable ID so later edits can target exactly one row
+    if "idea_id" not in post_df.columns:
+        post_df["idea_id"] = [str(uuid.uuid4()) for _ in range(len(post_df))]
 
-    if job.errors:
-        raise Exception(f"Failed to insert row into BigQuery: {job.errors}")
+    mutation_queue.enqueue_many(PAGE_ID, [(post["idea_id"], "insert", to_stored_row(post)) for post in post_df.to_dict("records")])
 
 
 # Function to delete a post idea from BigQuery
-def delete_post_by_caption(caption):
+def delete_post(page_id, idea_id):
     """
-    Delete a post idea from the smp_postideas table based on the caption.
+    Queue the deletion of a single post idea.
 
     Args:
-        caption (str): The caption of the post to delete.
+        page_id (int): The ID of the page the post belongs to.
+        idea_id (str): The stable ID of the post to delete.
     """
-    query = f"""
-        DELETE FROM `bizbuddydemo-v2.strategy_data.postideas`
-        WHERE caption = @caption
-    """
-    query_job = bq_client.query(query, job_config=bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("caption", "STRING", caption)
-        ]
-    ))
-    query_job.result()  # Wait for the query to complete
+    mutation_queue.enqueue(page_id, idea_id, "delete")
 
 def display_posts_with_tweak_option(posts_df):
     """
@@ -379,7 +866,7 @@ def display_posts_with_tweak_option(posts_df):
     Args:
         posts_df (pd.DataFrame): DataFrame containing posts with necessary fields.
     """
-    for index, row in posts_df.iterrows():
+    for row in posts_df.to_dict("records"):
         with st.expander(f"📢 {row['post_summary']}"):
             st.write(f"**Caption:** {row['caption']}")
             st.write(f"**Post Type:** {row['post_type']}")
@@ -387,60 +874,151 @@ def display_posts_with_tweak_option(posts_df):
             st.write(f"**Tone:** {', '.join(row['tone'])}")
 
             # Provide tweak option
-            user_tweak = st.text_area(f"Enter what you want to tweak about this post (Required)", key=f"tweak_{index}")
+            user_tweak = st.text_area(f"Enter what you want to tweak about this post (Required)", key=f"tweak_{row['idea_id']}")
 
-            if st.button("Tweak Post", key=f"tweak_button_{index}"):
+            if st.button("Tweak Post", key=f"tweak_button_{row['idea_id']}"):
                 if not user_tweak.strip():
                     st.error("You must enter something to tweak before submitting.")
                 else:
                     with st.spinner("Updating post..."):
-                        updated_post = tweak_post_idea(row.to_dict(), user_tweak)
+                        updated_post = tweak_post_idea(row, user_tweak)
 
                         if updated_post:
-                            update_post_in_bigquery(PAGE_ID, row["caption"], updated_post)
+                            update_post_in_bigquery(PAGE_ID, row, updated_post)
 
 
-def update_post_in_bigquery(page_id, previous_caption, updated_post):
+def update_post_in_bigquery(page_id, existing_post, updated_post):
     """
-    Update an existing post in BigQuery based on the previous caption.
+    Queue an update of an existing post with the tweaked fields.
 
     Args:
-        page_id (str): The ID of the page where the post belongs.
-        previous_caption (str): The caption of the original post (used as an identifier for the update).
+        page_id (int): The ID of the page where the post belongs.
+        existing_post (dict): The current post, including its 'idea_id'.
         updated_post (dict): The updated post data including 'post_summary', 'caption', 'post_type', 'themes', and 'tone'.
     """
+    update_posts_in_bigquery(page_id, [(existing_post, updated_post)])
 
-    query = f"""
-    UPDATE `bizbuddydemo-v2.strategy_data.postideas`
-    SET post_summary = @post_summary,
-        caption = @caption,
-        post_type = @post_type,
-        themes = @themes,
-        tone = @tone,
-        date = CAST(CURRENT_DATE() AS STRING)
-    WHERE caption = @previous_caption
+def update_posts_in_bigquery(page_id, updates):
     """
+    Queue updates for several posts at once, keyed by idea ID. They reach BigQuery in a single MERGE.
 
-    
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("post_summary", "STRING", updated_post["post_summary"]),
-            bigquery.ScalarQueryParameter("caption", "STRING", updated_post["caption"]),
-            bigquery.ScalarQueryParameter("post_type", "STRING", updated_post["post_type"]),
-            bigquery.ScalarQueryParameter("themes", "STRING", ",".join(updated_post["themes"])),
-            bigquery.ScalarQueryParameter("tone", "STRING", ",".join(updated_post["tone"])),
-            bigquery.ScalarQueryParameter("page_id", "STRING", page_id),
-            bigquery.ScalarQueryParameter("previous_caption", "STRING", previous_caption),
-        ]
-    )
+    Args:
+        page_id (int): The ID of the page where the posts belong.
+        updates (list): (existing post, updated post) pairs. Posts keep their scheduled date.
+    """
+    changes = []
+    for existing_post, updated_post in updates:
+        post = {**existing_post, **{field: updated_post.get(field) for field in IDEA_FIELDS}}
+        changes.append((existing_post["idea_id"], "update", to_stored_row(post)))
+    mutation_queue.enqueue_many(page_id, changes)
+
+# Most posts a single bulk tweak may touch
+BULK_TWEAK_MAX_POSTS = 50
 
-    query_job = bq_client.query(query, job_config=job_config)
-    query_job.result()  # Wait for job to complete
+# Function to pick the posts a bulk tweak applies to
+def select_posts(posts, post_types=None, date_range=None, theme_text=""):
+    """
+    Filter posts by type, scheduled date range and theme text.
+
+    Returns:
+        pd.DataFrame: The matching posts.
+    """
+    selected = posts
+    if post_types:
+        selected = selected[selected["post_type"].isin(post_types)]
+    if date_range and len(date_range) == 2:
+        dates = pd.to_datetime(selected["date"], errors="coerce").dt.date
+        selected = selected[(dates >= date_range[0]) & (dates <= date_range[1])]
+    if theme_text.strip():
+        selected = selected[selected["themes"].astype(str).str.contains(theme_text.strip(), case=False, regex=False)]
+    return selected
+
+# Function to tweak every post matching a filter in one pass
+def bulk_tweak_posts(posts):
+    """
+    Let the user select posts by filter and apply one tweak to all of them.
+
+    Args:
+        posts (pd.DataFrame): The page's current posts.
+    """
+    st.subheader("Bulk Tweak Posts")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        post_types = st.multiselect("Post Types", POST_TYPES, key="bulk_post_types")
+    with col2:
+        date_range = st.date_input("Scheduled Between", value=(), key="bulk_date_range")
+    with col3:
+        theme_text = st.text_input("Themes Containing", key="bulk_theme_text")
+
+    selected = select_posts(posts, post_types, date_range, theme_text)
+    st.caption(f"{len(selected)} post(s) selected")
+
+    user_tweak = st.text_area("Enter what you want to tweak about every selected post (Required)", key="bulk_tweak", placeholder="e.g. Add a call-to-action to book a free session... ect.")
+
+    if st.button("Tweak Selected Posts", key="bulk_tweak_button"):
+        if not user_tweak.strip():
+            st.error("You must enter something to tweak before submitting.")
+        elif selected.empty:
+            st.warning("No posts match these filters.")
+        elif len(selected) > BULK_TWEAK_MAX_POSTS:
+            st.error(f"Select at most {BULK_TWEAK_MAX_POSTS} posts at a time.")
+        else:
+            with st.spinner(f"Updating {len(selected)} posts..."):
+                tweaked, failed = tweak_post_ideas(selected.to_dict("records"), user_tweak)
+                if tweaked:
+                    update_posts_in_bigquery(PAGE_ID, tweaked)
+
+            notice = f"{len(tweaked)} post(s) successfully updated!"
+            if failed:
+                notice += f" {failed} post(s) could not be tweaked, please try them again."
+            st.session_state["scheduler_notice"] = notice
+            st.rerun()
+
+# Function to show queued edits on top of what BigQuery returned
+def apply_pending_mutations(posts, pending):
+    """
+    Overlay edits that have not been flushed yet onto the fetched posts.
+
+    Args:
+        posts (pd.DataFrame): Post ideas as stored in BigQuery.
+        pending (dict): {idea_id: (op, row)} from the mutation queue.
+
+    Returns:
+        pd.DataFrame: The post ideas as the user last left them, ordered by date.
+    """
+    if not pending:
+        return posts
+
+    posts = posts[~posts["idea_id"].isin(pending.keys())]
+    queued = [{"idea_id": idea_id, **row} for idea_id, (op, row) in pending.items() if op != "delete"]
+    if queued:
+        posts = pd.concat([posts, pd.DataFrame(queued)], ignore_index=True)
+
+    return posts.sort_values("date", kind="stable").reset_index(drop=True)
+
+# Function to give legacy post ideas (saved before IDs existed) a stable ID
+def backfill_idea_ids(page_id):
+    """
+    Assign an idea_id to any post idea for the page that does not have one yet.
+
+    Args:
+        page_id (int): The ID of the page to backfill.
+    """
+    query = """
+        UPDATE `bizbuddydemo-v2.strategy_data.postideas`
+        SET idea_id = GENERATE_UUID(), updated_at = CURRENT_TIMESTAMP()
+        WHERE page_id = @page_id AND idea_id IS NULL
+    """
+    query_job = bq_client.query(query, job_config=bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter("page_id", "INT64", page_id)]
+    ))
+    query_job.result()  # Wait for the query to complete
 
 def fetch_post_data(page_id):
     """Fetch post data from BigQuery for a specific page ID."""
     query = """
-        SELECT date, post_summary, caption, post_type, themes, tone, source
+        SELECT idea_id, date, post_time, post_summary, caption, post_type, themes, tone, source
         FROM `bizbuddydemo-v2.strategy_data.postideas`
         WHERE page_id = @page_id
         ORDER BY date ASC
@@ -455,24 +1033,72 @@ def fetch_post_data(page_id):
 
     return query_job.to_dataframe()
 
-def main():
-    past_post_ideas = fetch_past_post_ideas(PAGE_ID)
-    account_inspiration = fetch_account_inspiration(PAGE_ID)
-    past_posts = fetch_past_post_concepts(PAGE_ID)
-    account_insights = fetch_account_insights(PAGE_ID)
+# Seconds between checks for changes made outside this app
+IDEA_STORE_VERSION_TTL = 60
+
+@st.cache_data(ttl=IDEA_STORE_VERSION_TTL, show_spinner=False)
+def fetch_ideas_version(page_id):
+    """
+    Cheap change check for a page's post ideas.
 
+    Returns:
+        tuple: The latest update time and the number of ideas for the page.
+    """
+    query = """
+        SELECT MAX(updated_at) AS updated_at, COUNT(*) AS idea_count
+        FROM `bizbuddydemo-v2.strategy_data.postideas`
+        WHERE page_id = @page_id
+    """
+
+    query_job = bq_client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("page_id", "INT64", page_id)]
+        ),
+    )
+
+    row = list(query_job.result())[0]
+    return str(row.updated_at), row.idea_count
+
+# Function to get a page's ideas, including edits not yet written to BigQuery
+def current_posts(page_id):
+    posts = idea_store.get(page_id, fetch_ideas_version(page_id), load_post_data)
+    return apply_pending_mutations(posts, mutation_queue.pending(page_id))
+
+# Function to load a page's ideas into the idea store
+def load_post_data(page_id):
+    posts = fetch_post_data(page_id)
+
+    # Ideas saved before IDs existed get one so they can be edited and deleted
+    if posts["idea_id"].isna().any():
+        backfill_idea_ids(page_id)
+        posts = fetch_post_data(page_id)
+
+    return posts
+
+def main():
     st.markdown(
         """<h1 style='text-align: center;'>Post Scheduler & Idea Generator🧪</h1>""",
         unsafe_allow_html=True
     )
 
+    # Confirmation left by an edit made before the last rerun
+    if "scheduler_notice" in st.session_state:
+        st.success(st.session_state.pop("scheduler_notice"))
+
     with st.expander("Add an AI generated Post"):
         # User input for additional context
         user_context = st.text_area("Optional: Add context for this post idea (e.g., seasonal theme, specific campaign focus, etc.)", placeholder = "e.g. I wanna post using this trend... I wanna promote a new product/service... ect.")
+
+        # Generate several ideas in one request to fill the calendar faster
+        idea_count = st.number_input("Number of posts to generate", min_value=1, max_value=30, value=1, step=1)
     
         # Add functionality to generate and add a post
         if st.button("Add AI Generated Post", key="generate_post_id"):
             with st.spinner("Generating and adding post..."):
+                # Load account context (cached per page)
+                account_inspiration, past_posts, account_insights = fetch_generation_context(PAGE_ID)
+
                 # Load strategy data (placeholder example)
                 strategy = {
                     "content_plan": [
@@ -482,27 +1108,67 @@ def main():
                     "post_types": ["Reel", "Story", "Static Post"],
                 }
 
-                # Generate a post idea with optional user context
-                post_df = generate_post_idea(strategy, past_posts, account_inspiration, past_post_ideas, account_insights, user_context)
+                # Over-generate when the page has a trained scorer, so the weakest ideas can be dropped locally
+                model = load_engagement_model(PAGE_ID)
+                scorer = EngagementScorer(model) if model else None
+                candidate_count = min(int(idea_count) * OVERGENERATE_FACTOR, MAX_IDEAS_PER_REQUEST) if scorer else int(idea_count)
+
+                # Generate post ideas with optional user context, replacing any that repeat an existing idea
+                posts = current_posts(PAGE_ID)
+                index = build_idea_index(posts)
+                post_df, rejected = generate_unique_post_ideas(strategy, past_posts, account_inspiration, account_insights, user_context, candidate_count, index)
+
+                candidates = len(post_df)
+                if scorer and candidates > idea_count:
+                    post_df = rank_post_ideas(post_df, scorer, int(idea_count))
 
-                # Add the post to BigQuery
+                # Schedule and queue the posts for BigQuery
                 if not post_df.empty:
+                    post_df = schedule_post_ideas(post_df, posts, model)
                     add_post_to_bigquery(post_df)
 
-            st.success("Post successfully added!")
+            if not post_df.empty:
+                st.success(f"{len(post_df)} post(s) successfully added!")
+            if rejected:
+                st.caption(f"Skipped {rejected} idea(s) that were too similar to existing posts.")
+            if not post_df.empty and candidates > len(post_df):
+                st.caption(f"Kept the top {len(post_df)} of {candidates} candidates by predicted reach.")
 
     with st.expander("Manually Add a Post:"):
         manually_add_post()
 
-    # Fetch data from BigQuery
-    posts = fetch_post_data(PAGE_ID)
+    # Serve ideas from the in-memory store, with edits still waiting to be written to BigQuery
+    posts = current_posts(PAGE_ID)
+    pending = mutation_queue.pending(PAGE_ID)
+
+    st.sidebar.divider()
+    if pending:
+        st.sidebar.caption(f"{len(pending)} change(s) waiting to sync")
+        if st.sidebar.button("Sync now"):
+            with st.spinner("Syncing changes..."):
+                mutation_queue.flush()
+            st.rerun()
+    stats = validation_stats.snapshot()
+    if stats["ideas"]:
+        st.sidebar.caption(
+            f"{stats['invalid'] / stats['ideas']:.0%} of {stats['ideas']} generated ideas failed validation "
+            f"({stats['repaired']} repaired, {stats['reverted']} reverted to the original, {stats['dropped']} dropped), "
+            f"{stats['unparseable']} unreadable responses"
+        )
+    if mutation_queue.last_error:
+        st.sidebar.warning(f"Changes could not be synced yet, retrying shortly.\nError: {mutation_queue.last_error}")
+
+    with st.expander("Bulk Tweak Posts:"):
+        bulk_tweak_posts(posts)
 
     # Display posts
     st.subheader("Upcoming Posts")
 
-    for index, row in posts.iterrows():
+    for row in posts.to_dict("records"):
         with st.expander(f"{row['date']}, {row['post_type']}: {row['caption'][:50]}..."):
             st.markdown(f"**Date:** {row['date']}")
+            if isinstance(row.get("post_time"), str):
+                st.markdown(f"**Time:** {row['post_time']}")
             st.markdown(f"**Post Summary:** {row['post_summary']}")
             st.markdown(f"**Caption:** {row['caption']}")
             st.markdown(f"**Post Type:** {row['post_type']}")
@@ -515,27 +1181,26 @@ def main():
             # Split update and delete
             with col1:
                 # --- NEW: Tweak Post Feature ---
-                user_tweak = st.text_area(f"Enter what you want to tweak about this post (Required)", key=f"tweak_{index}", placeholder="e.g. Make the language of this post more cheerful... Add a call-to-action... ect.")
+                user_tweak = st.text_area(f"Enter what you want to tweak about this post (Required)", key=f"tweak_{row['idea_id']}", placeholder="e.g. Make the language of this post more cheerful... Add a call-to-action... ect.")
     
-                if st.button("Tweak Post", key=f"tweak_button_{index}"):
+                if st.button("Tweak Post", key=f"tweak_button_{row['idea_id']}"):
                     if not user_tweak.strip():
                         st.error("You must enter something to tweak before submitting.")
                     else:
                         with st.spinner("Updating post..."):
-                            updated_post = tweak_post_idea(row.to_dict(), user_tweak)
+                            updated_post = tweak_post_idea(row, user_tweak)
     
                             if updated_post:
-                                update_post_in_bigquery(PAGE_ID, row["caption"], updated_post)
-                                st.success("Post successfully updated! Refresh the page to see changes.")
+                                update_post_in_bigquery(PAGE_ID, row, updated_post)
+                                st.session_state["scheduler_notice"] = "Post successfully updated!"
+                                st.rerun()
 
             with col2:
                 # Delete Post Option
-                if st.button("Delete Post", key=f"delete_{index}"):
-                    try:
-                        delete_post_by_caption(row['caption'])
-                        st.success("Post successfully deleted! Refresh the page to see updates.")
-                    except Exception as e:
-                        st.error(f"Failed to delete post: {e}")
+                if st.button("Delete Post", key=f"delete_{row['idea_id']}"):
+                    delete_post(PAGE_ID, row['idea_id'])
+                    st.session_state["scheduler_notice"] = "Post successfully deleted!"
+                    st.rerun()
 
 if __name__ == "__main__":
     main()
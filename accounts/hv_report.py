@@ -1,6 +1,9 @@
 import streamlit as st
 from google.oauth2 import service_account
 from google.cloud import bigquery
+from google.cloud import storage
+from google.api_core.exceptions import NotFound
+import streamlit.components.v1 as components
 import pandas as pd
 from datetime import date, timedelta
 import plotly.express as px
@@ -30,8 +33,46 @@ project_id = st.secrets["gcp_service_account"]["project_id"]
 
 client = bigquery.Client(credentials=credentials, project=project_id)
 
-# Function to fetch data from BigQuery
-@st.cache_data
+# Prebuilt reports are written to this bucket by report_builder.py
+storage_client = storage.Client(credentials=credentials)
+REPORT_BUCKET = config["REPORT_BUCKET"]
+REPORT_TENANT = "hv"
+
+# Load the written narrative for this report
+def load_narrative(tenant):
+    with open(f"report_narratives/{tenant}.json", "r") as f:
+        return json.load(f)
+
+narrative = load_narrative(REPORT_TENANT)
+
+# Download a prebuilt report artifact, a missing one raises NotFound so the miss isn't cached
+@st.cache_data(ttl=3600)
+def download_report_artifact(tenant, filename):
+    return storage_client.bucket(REPORT_BUCKET).blob(f"{tenant}/{filename}").download_as_bytes()
+
+# Fetch a prebuilt report artifact, returns None if it hasn't been generated yet
+def fetch_report_artifact(tenant, filename):
+    try:
+        return download_report_artifact(tenant, filename)
+    except NotFound:
+        return None
+
+def display_report_artifact(report_html, report_pdf):
+    """Serve the prebuilt report instead of recomputing it on every visit."""
+    col_html, col_pdf = st.columns(2)
+    with col_html:
+        st.download_button("Download Report (HTML)", report_html, file_name="social_report.html", mime="text/html")
+    with col_pdf:
+        if report_pdf is not None:
+            st.download_button("Download Report (PDF)", report_pdf, file_name="social_report.pdf", mime="application/pdf")
+
+    components.html(report_html.decode("utf-8"), height=4000, scrolling=True)
+
+# Report tables are refreshed once a day upstream, so cached query results are reused for an hour
+REPORT_DATA_TTL = 3600
+
+# Function to fetch data from BigQuery, every report query goes through this cache
+@st.cache_data(ttl=REPORT_DATA_TTL, show_spinner=False)
 def fetch_data(query: str) -> pd.DataFrame:
     query_job = client.query(query)  # Execute query
     result = query_job.result()  # Wait for the query to finish
@@ -53,20 +94,12 @@ def pull_dataframes(dataset_id, table_id):
     query = f"SELECT * FROM `{table_ref}` WHERE page_id = {PAGE_ID}"
     
     try:
-        # Execute the query
-        query_job = client.query(query)
-        result = query_job.result()
-        # Convert the result to a DataFrame
-        data = result.to_dataframe()
-        return data
+        # Execute the query (cached)
+        return fetch_data(query)
     except Exception as e:
         st.error(f"Error fetching data: {e}")
         return None
 
-#Get demographic data
-demo_data = pull_dataframes(DATASET_ID, DEMOGRAPHIC_TABLE_ID)
-#st.write(demo_data)
-
 
 # Function to plot pie chart using Plotly
 def plot_pie_chart(breakdown, df):
@@ -156,41 +189,51 @@ ORDER BY created_time DESC
 analysis_query = f"""
 SELECT *
 FROM `bizbuddydemo-v2.{datasetid}.{analysis_tableid}`
+WHERE page_id = {page_id}
 ORDER BY created_time DESC
 """
 
-# Load post data
-post_data = fetch_data(post_query)
-post_data["Like Rate"] = round(post_data["like_count"] / post_data["reach"] * 100, 2)
+@st.cache_data(ttl=REPORT_DATA_TTL, show_spinner="Loading report data...")
+def load_report_data():
+    """
+    Load everything the live report needs in one cached step.
 
-#Fix post timing but maintain old created_time column
-post_data["created_time_og"] = post_data["created_time"]
+    Nothing is queried at import time, and reruns within REPORT_DATA_TTL reuse
+    the cached frames instead of issuing new BigQuery jobs.
 
-post_data["created_time"] = pd.to_datetime(post_data["created_time"]).dt.date
+    Returns:
+        tuple: (merged_data, demo_data) DataFrames.
+    """
+    # Load post data
+    post_data = fetch_data(post_query)
+    post_data["Like Rate"] = round(post_data["like_count"] / post_data["reach"] * 100, 2)
 
-# Load analysis data
-analysis_data = fetch_data(analysis_query)
+    #Fix post timing but maintain old created_time column
+    post_data["created_time_og"] = post_data["created_time"]
 
-# Merge post data with analysis data on post_id = video_id
-merged_data = post_data.merge(
-    analysis_data, left_on="post_id", right_on="video_id", how="left", suffixes=("_posts", "_aps")
-)
+    post_data["created_time"] = pd.to_datetime(post_data["created_time"]).dt.date
 
-# Drop unnecessary duplicate columns after merge
-merged_data = merged_data.drop(
-    columns=["reach_aps", "like_count_aps", "comments_count_aps", "shares_aps", "saved_aps", "created_time_aps"]
-)
+    # Load analysis data
+    analysis_data = fetch_data(analysis_query)
+
+    # Merge post data with analysis data on post_id = video_id
+    merged_data = post_data.merge(
+        analysis_data, left_on="post_id", right_on="video_id", how="left", suffixes=("_posts", "_aps")
+    )
 
-assign_time_buckets(merged_data)
+    # Drop unnecessary duplicate columns after merge
+    merged_data = merged_data.drop(
+        columns=["reach_aps", "like_count_aps", "comments_count_aps", "shares_aps", "saved_aps", "created_time_aps"]
+    )
 
-merged_data = merged_data.rename(columns={"reach_posts":"reach", "like_count_posts":"like_count", "comments_count_posts":"comments_count", "shares_posts":"shares", "saved_posts":"saved"})
+    merged_data = assign_time_buckets(merged_data)
 
-# Function to fetch data from BigQuery
-def fetch_data(query: str) -> pd.DataFrame:
-    client = bigquery.Client(credentials=credentials, project=project_id)
-    query_job = client.query(query)  # Make a query request
-    result = query_job.result()  # Wait for the query to finish
-    return result.to_dataframe()
+    merged_data = merged_data.rename(columns={"reach_posts":"reach", "like_count_posts":"like_count", "comments_count_posts":"comments_count", "shares_posts":"shares", "saved_posts":"saved"})
+
+    #Get demographic data
+    demo_data = fetch_data(f"SELECT * FROM `{PROJECT_ID}.{DATASET_ID}.{DEMOGRAPHIC_TABLE_ID}` WHERE page_id = {PAGE_ID}")
+
+    return merged_data, demo_data
 
 # Define filter functions
 def filter_last_30_days(df):
@@ -204,6 +247,9 @@ def filter_last_6_months(df):
 def top_10_by_column(df, column):
     return df.sort_values(by=column, ascending=False).head(10)
 
+def markdown_bullets(items):
+    return "\n".join(f"- {item}" for item in items)
+
 def main():
     st.title("Social Buddy 🚀 - Harborview Social Report")
 
@@ -222,6 +268,16 @@ def main():
     for page, url in PAGES.items():
         st.sidebar.markdown(f"[**{page}**]({url})", unsafe_allow_html=True)# Filtering Options
 
+    # Serve the prebuilt report when one exists
+    report_html = fetch_report_artifact(REPORT_TENANT, "social_report.html")
+    if report_html is not None:
+        display_report_artifact(report_html, fetch_report_artifact(REPORT_TENANT, "social_report.pdf"))
+        return
+
+    st.info(f"No prebuilt report found, showing the live report. Run `python report_builder.py --tenant {REPORT_TENANT}` to generate one.")
+
+    merged_data, demo_data = load_report_data()
+
     #Pull account data
     account_data = pull_dataframes(DATASET_ID, ACCOUNT_TABLE_ID)
 
@@ -237,14 +293,10 @@ def main():
 
     with col_sum:
         st.subheader("Account Overview")
-        st.write("Your account has grown significantly over the last 90 days, posting around 30 times and gaining 1,500+ followers (a 150% increase).")
+        st.write(narrative["overview_intro"])
         st.write("Here are the highlights:")
-        st.markdown("""
-        - Your account has turned a corner, with posts receiving a 10x increase in average engagement.
-        - A new style has emerged, using reels to deliver informative and engaging content that resonates with your audience.
-        - New followers bring new customer demographics for your business to reach.
-        """)
-        st.write("Below is a detailed analysis of your account data, which we'll use to refine your social strategy and convert engagement into customers.")
+        st.markdown(markdown_bullets(narrative["overview_highlights"]))
+        st.write(narrative["overview_outro"])
     with col_follows:
         # Line chart for total followers over time using Plotly
         if account_data is not None and not account_data.empty:
@@ -300,10 +352,7 @@ def main():
     ### What are we posting section ###
     st.subheader(f"*What* are we posting?")
     st.write("Let's take a look at your recent content to see what types of posts are working, which aren't, and where there may be untapped opportunities.")
-    st.markdown("""
-    - Content: Most posts focus on the appeal of Port Washington, where the Harborview is located. Other content highlights hotel facilities with visuals of rooms, dining areas, and common spaces.
-    - Themes: Posts generally carry a positive tone, encouraging visitors to use the Harborview as a weekend escape from nearby cities. Other themes include collaboration and giveaways, which drive more direct engagement from users.
-    """)
+    st.markdown(markdown_bullets(narrative["what_bullets"]))
     st.write("Now let’s dive into the data to see how this content is performing.")        
 
     with st.expander("See Full Content Analysis"):
@@ -359,11 +408,7 @@ def main():
     ### How we are posting section ###
     st.subheader(f"*How* are we posting?")
     st.write("Now let's take a look at how we're posting and how it's performing.")
-    st.markdown("""
-    - Format: Most recent posts are multi-shot reels featuring the hotel and surrounding areas.
-    - Visuals: The primary visual focus is the hotel, with recent content using drone footage. Videos typically start with the Port Washington bay and transition into hotel accommodations and amenities.
-    - Timing: Posts go out at various times of day and across different days of the week. While no clear pattern appears by day, time of day is emerging as a key factor in performance.
-    """)
+    st.markdown(markdown_bullets(narrative["how_bullets"]))
     st.write("Let’s take a deeper look at the data to evaluate the effectiveness of these methods.")
 
 
@@ -462,10 +507,7 @@ def main():
     ### What are we posting section ###
     st.subheader(f"*Who* is seeing our posts?")
     st.write("Finally, let's see who’s following your account:")
-    st.markdown("""
-    - Age/Gender: The majority of your followers are female (about two-thirds of your follower base), primarily between the ages of 25–55.
-    - Locations: Most followers are from Wisconsin, with a smaller segment from Illinois—primarily Chicago. Within Wisconsin, many are from Milwaukee, followed by Port Madison, and smaller surrounding towns.
-    """)
+    st.markdown(markdown_bullets(narrative["who_bullets"]))
     st.write("Let’s take a deeper look at the data to see exactly who’s following you.")
 
 
@@ -487,39 +529,15 @@ def main():
     st.divider()
 
     st.subheader("Recommendations from Analysis")
-    st.write("Your account is gaining serious momentum, creating strong potential for your business. Using insights from BizBuddy, you can refine your content and strategy to drive conversions.")
-    
-    #Content Analysis
-    st.write("Content:")
-    st.markdown("""
-    - You’ve had great success posting content about the appeal of Port Washington, giving followers another reason to book a stay at the Harborview.
-    - Some content and themes are becoming repetitive. You don’t need to stray far from your core message, but try presenting it in new ways. Audiences respond better when the same idea is delivered through varied messaging.
-    - Use the word cloud to identify which words and themes are being used most often.
-    - Your most successful posts are those that directly engage users (e.g., free room giveaways). Use rewards to drive interaction, then follow up with posts that highlight the benefits of staying.
-    - This strategy works well in advertising, and with Instagram, it's free—or very affordable if boosted.
-    """)
-    
-    #Style Analysis
-    st.write("Style:")
-    st.markdown("""
-    - A clear insight from the data: posting later in the day leads to greater reach via Instagram’s algorithm. This may be due to user behavior or less competition in evening hours.
-    - Picture your target user finishing their day and scrolling in the evening—this is your window. Use it.
-    - Users are responding well to imagery featuring the marina and water in Port Madison. Lean into this visual theme.
-    - Consider mixing in nature shots like parks and hikes from nearby areas. Start with nature to draw attention, then transition to hotel amenities to position the Harborview as a peaceful escape.
-    - For shot style, longer videos with more visual elements tend to perform better. Aim for 20–30 seconds—long enough to offer substance, short enough to keep attention.
-    """)
-    
-    #Demographic Analysis
-    st.write("Demographic:")
-    st.markdown("""
-    - Your primary audience is women aged 25–54 from Milwaukee and Chicago.
-    - These users are likely looking for a nearby getaway—using the Harborview as a home base for escaping the city and enjoying peaceful Port Washington.
-    - Now that we have a defined customer profile, tailor your content to convert followers into bookings. Show families at the hotel or couples enjoying a quiet dinner by the water.
-    - You’re also missing certain customer types. Use Instagram as a top-of-funnel tool to reach new audiences—business travelers, solo adventurers, or boaters exploring Lake Michigan could all be targeted.
-    """)
+    st.write(narrative["recommendations_intro"])
+
+    # Content, Style and Demographic recommendations
+    for section, items in narrative["recommendations"].items():
+        st.write(f"{section}:")
+        st.markdown(markdown_bullets(items))
 
     st.write("Summary:")
-    st.write("Your content strategy is resonating well when emphasizing the appeal of Port Washington, particularly with engaging posts like giveaways, but risks becoming repetitive—so focus on refreshing the message while keeping the theme consistent. To improve performance, post later in the day, lean into marina and nature imagery, and tailor content toward your primary demographic of women aged 25–54 from nearby cities, while exploring new audiences like solo travelers or business visitors.")
+    st.write(narrative["summary"])
     
     st.divider()
 
@@ -1,10 +1,261 @@
-from openai import OpenAI
+import openai
 import streamlit as st
+from google.oauth2 import service_account
+from google.cloud import bigquery
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
+import pandas as pd
+from llm_gateway import LLMGateway, LLMResponseCache
+
+# Local token counting, falls back to an estimate if tiktoken isn't installed
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
 
 st.set_page_config(page_title="Post Brainstormer", layout="wide", page_icon = "💡")
 
 openai_api_key = st.secrets["openai"]["api_key"]
 
+# Load the configuration file
+def load_config(file_path="config.json"):
+    with open(file_path, "r") as f:
+        return json.load(f)
+
+# Load the account configuration
+config = load_config()
+
+# Set env variables
+PROJECT_ID = config["PROJECT_ID"]
+DATASET_ID = config["DATASET_ID"]
+POST_TABLE_ID = config["POST_TABLE_ID"]
+ANALYSIS_TABLE_ID = config["ANALYSIS_TABLE_ID"]
+ACCOUNT_DATASET_ID = config["ACCOUNT_DATASET_ID"]
+BUSINESS_TABLE_ID = config["BUSINESS_TABLE_ID"]
+PAGE_ID = 17841467554159158
+
+# Load credentials and project ID from st.secrets
+credentials = service_account.Credentials.from_service_account_info(
+    st.secrets["gcp_service_account"]
+)
+
+# Load BQ Client
+bq_client = bigquery.Client(credentials=credentials, project=PROJECT_ID)
+
+@st.cache_resource
+def get_llm_gateway(api_key):
+    return LLMGateway(api_key, cache=LLMResponseCache())
+
+# Initialize OpenAI client
+client = get_llm_gateway(openai_api_key)
+
+# Conversation memory: each request stays within this many tokens, older turns get summarized
+MEMORY_TOKEN_BUDGET = 3000
+# Number of most recent messages that are always sent verbatim
+MEMORY_RECENT_MESSAGES = 6
+CHAT_MODEL = "gpt-3.5-turbo"
+
+@st.cache_resource
+def get_token_encoding(model):
+    return tiktoken.encoding_for_model(model) if tiktoken is not None else None
+
+def count_tokens(messages):
+    """Count the prompt tokens for a list of chat messages locally."""
+    encoding = get_token_encoding(CHAT_MODEL)
+    total = 0
+    for message in messages:
+        content = message["content"]
+        # ~4 tokens of per-message overhead; ~4 characters per token without tiktoken
+        total += 4 + (len(encoding.encode(content)) if encoding is not None else len(content) // 4 + 1)
+    return total
+
+def summarize_turns(summary, turns):
+    """Fold older chat turns into the rolling conversation summary."""
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    prompt = (
+        f"Here is the summary of the conversation so far:\n{summary or 'None yet.'}\n\n"
+        f"Here are the next turns of the conversation:\n{transcript}\n\n"
+        "Update the summary to cover everything above. Keep facts about the business, ideas discussed, "
+        "decisions made and open questions. Keep it under 200 words."
+    )
+    response = client.create(
+        model=CHAT_MODEL,
+        temperature=0,
+        messages=[
+            {"role": "system", "content": "You summarize brainstorming conversations between a small business and their social media manager."},
+            {"role": "user", "content": prompt}
+        ]
+    )
+    return response.choices[0].message.content.strip()
+
+def build_request_messages():
+    """
+    Return the messages to send for this turn.
+
+    The system prompt and recent turns are sent verbatim. When the request would go over
+    MEMORY_TOKEN_BUDGET, everything but the last MEMORY_RECENT_MESSAGES turns is folded into
+    a rolling summary kept in session state, so request size stays flat as the chat grows.
+    """
+    system_message, conversation = st.session_state.messages[0], st.session_state.messages[1:]
+    summary = st.session_state.get("memory_summary", "")
+    folded = st.session_state.get("memory_folded", 0)
+
+    def request_for(summary, folded):
+        request = [system_message]
+        if summary:
+            request.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+        return request + conversation[folded:]
+
+    request = request_for(summary, folded)
+    fold_until = len(conversation) - MEMORY_RECENT_MESSAGES
+    if count_tokens(request) > MEMORY_TOKEN_BUDGET and fold_until > folded:
+        summary = summarize_turns(summary, conversation[folded:fold_until])
+        folded = fold_until
+        st.session_state["memory_summary"] = summary
+        st.session_state["memory_folded"] = folded
+        request = request_for(summary, folded)
+
+    return request
+
+def timed_stream(chunks, metrics):
+    """Pass chunks through while recording time to first token and total time (seconds) in metrics."""
+    start = time.perf_counter()
+    for chunk in chunks:
+        if "time_to_first_token" not in metrics:
+            metrics["time_to_first_token"] = time.perf_counter() - start
+        yield chunk
+    metrics["total_time"] = time.perf_counter() - start
+
+def run_query(query, page_id):
+    query_job = bq_client.query(
+        query,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("page_id", "INT64", page_id)]
+        )
+    )
+    return query_job.to_dataframe()
+
+# Account brief queries, each one small and pre-aggregated in BigQuery
+BRIEF_QUERIES = {
+    "business": f"""
+        SELECT description
+        FROM `{PROJECT_ID}.{ACCOUNT_DATASET_ID}.{BUSINESS_TABLE_ID}`
+        WHERE page_id = @page_id
+        LIMIT 1
+    """,
+    "performance": f"""
+        SELECT COUNT(*) AS post_count, AVG(reach) AS avg_reach, AVG(like_count) AS avg_likes
+        FROM `{PROJECT_ID}.{DATASET_ID}.{POST_TABLE_ID}`
+        WHERE page_id = @page_id
+        AND DATE(insert_date) = DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY)
+        AND DATE(created_time) >= DATE_SUB(CURRENT_DATE(), INTERVAL 90 DAY)
+    """,
+    "top_posts": f"""
+        SELECT caption, reach, like_count
+        FROM `{PROJECT_ID}.{DATASET_ID}.{POST_TABLE_ID}`
+        WHERE page_id = @page_id
+        AND DATE(insert_date) = DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY)
+        AND reach IS NOT NULL
+        ORDER BY reach DESC
+        LIMIT 3
+    """,
+    "themes": f"""
+        SELECT main_theme, AVG(reach) AS avg_reach, COUNT(*) AS post_count
+        FROM (SELECT DISTINCT video_id, main_theme, reach FROM `{PROJECT_ID}.{DATASET_ID}.{ANALYSIS_TABLE_ID}` WHERE page_id = @page_id)
+        WHERE main_theme IS NOT NULL
+        GROUP BY main_theme
+        ORDER BY avg_reach DESC
+        LIMIT 3
+    """,
+    "timing": f"""
+        SELECT time_bucket, AVG(reach) AS avg_reach
+        FROM (SELECT DISTINCT video_id, time_bucket, reach FROM `{PROJECT_ID}.{DATASET_ID}.{ANALYSIS_TABLE_ID}` WHERE page_id = @page_id)
+        WHERE time_bucket IS NOT NULL
+        GROUP BY time_bucket
+        ORDER BY avg_reach DESC
+        LIMIT 3
+    """,
+    "insights": f"""
+        SELECT notes
+        FROM `{PROJECT_ID}.{ACCOUNT_DATASET_ID}.accountinsights`
+        WHERE page_id = @page_id
+        ORDER BY update_date DESC
+        LIMIT 1
+    """,
+}
+
+def format_count(value):
+    # NULL metrics come back from BigQuery as pd.NA or NaN, which can't be number-formatted
+    return "unknown" if pd.isna(value) else f"{value:,.0f}"
+
+@st.cache_data(ttl=21600, show_spinner="Loading account brief...")
+def fetch_account_brief(page_id):
+    """
+    Build a compact account brief from post performance, post analysis and account insights.
+
+    Cached per page for six hours, so chat turns never read from the warehouse.
+
+    Returns:
+        tuple: (business_description, brief) strings, either may be empty.
+    """
+    with ThreadPoolExecutor(max_workers=len(BRIEF_QUERIES)) as executor:
+        futures = {name: executor.submit(run_query, query, page_id) for name, query in BRIEF_QUERIES.items()}
+
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception:
+            # A missing table or column just leaves that part out of the brief
+            results[name] = None
+
+    def has_rows(name):
+        return results[name] is not None and not results[name].empty
+
+    business_description = results["business"].iloc[0]["description"] if has_rows("business") else ""
+
+    lines = []
+    if has_rows("performance") and results["performance"].iloc[0]["post_count"]:
+        row = results["performance"].iloc[0]
+        lines.append(f"- Last 90 days: {row['post_count']} posts, {format_count(row['avg_reach'])} average reach, {format_count(row['avg_likes'])} average likes.")
+    if has_rows("top_posts"):
+        lines.append("- Top posts by reach:")
+        for _, row in results["top_posts"].iterrows():
+            lines.append(f"  - \"{str(row['caption'])[:120]}\" ({format_count(row['reach'])} reach, {format_count(row['like_count'])} likes)")
+    if has_rows("themes"):
+        themes = ", ".join(f"{row['main_theme']} ({format_count(row['avg_reach'])} avg reach)" for _, row in results["themes"].iterrows())
+        lines.append(f"- Best performing themes: {themes}.")
+    if has_rows("timing"):
+        times = ", ".join(f"{row['time_bucket']} ({format_count(row['avg_reach'])} avg reach)" for _, row in results["timing"].iterrows())
+        lines.append(f"- Best posting times: {times}.")
+    if has_rows("insights"):
+        lines.append(f"- Account insights: {results['insights'].iloc[0]['notes']}")
+
+    return business_description, "\n".join(lines)
+
+# Used when the business context table has no description for this page
+DEFAULT_BUSINESS_DESCRIPTION = (
+    "The business is a Sports Psychologist located in Boise Idaho. They work with teams and individuals to optimize their mental ability in various areas to optimize performance during competition. Their instagram goals are to gain a following around their content which then turns into customers for their business. "
+    "They like to post voice over content about different concepts or applications of sports psychology."
+)
+
+def build_system_prompt(business_description, brief):
+    prompt = (
+        "You are an experienced social media manager working with a small business. "
+        "They are going to chat with you in here and would like your expertise to help brainstorm. "
+        f"{business_description or DEFAULT_BUSINESS_DESCRIPTION} "
+        "Key goals include increasing audience engagement, optimizing post performance, "
+        "and improving overall brand visibility. Assume that the user may have questions "
+        "about strategy, content planning, analytics, or scheduling."
+    )
+    if brief:
+        prompt += (
+            "\n\nHere is a brief of the account's real Instagram performance. "
+            f"Ground your suggestions in it and refer to it when relevant:\n{brief}"
+        )
+    return prompt
+
 # Define links to other pages
 PAGES = {
     "📊 Overview": "https://smp-bizbuddy-accountoverview.streamlit.app/",
@@ -21,20 +272,10 @@ for page, url in PAGES.items():
 st.title("💬BizBuddy Chatbot")
 st.caption("🚀 A BizBuddy chatbot that understands your business, powered by OpenAI")
 if "messages" not in st.session_state:
-    # Prepopulate the chat with a system message containing business context
+    # Prepopulate the chat with a system message containing business context and the account brief
+    business_description, account_brief = fetch_account_brief(PAGE_ID)
     st.session_state["messages"] = [
-        {
-            "role": "system",
-            "content": (
-                "You are an experienced social media manager working with a small business"
-                "They are going to chat with you in here and would like your expertise to help brainstorm"
-                "The business is a Sports Psychologist located in Boise Idaho. They work with teams and individuals to  optimize their mental ability in various areas to optimize performance during competition. Their instagram goals are to gain a following around my content which then turns into customers for my business. "
-                "They like to post voice over content about different concepts or applications of sports psychology. "
-                "Key goals include increasing audience engagement, optimizing post performance, "
-                "and improving overall brand visibility. Assume that the user may have questions "
-                "about strategy, content planning, analytics, or scheduling."
-            ),
-        },
+        {"role": "system", "content": build_system_prompt(business_description, account_brief)},
         {"role": "assistant", "content": "How can I help you today?"}
     ]
 
@@ -45,17 +286,31 @@ for msg in st.session_state.messages:
 
 # Handle new user inputs
 if prompt := st.chat_input():
-    client = OpenAI(api_key=openai_api_key)
     # Append the user's message
     st.session_state.messages.append({"role": "user", "content": prompt})
     st.chat_message("user").write(prompt)
 
-    # Send the full conversation history, including business context, to OpenAI
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=st.session_state.messages
-    )
-    msg = response.choices[0].message.content
-    # Append the assistant's response
+    # Send the business context and token-budgeted conversation history to OpenAI and stream the reply
+    metrics = {}
+    with st.chat_message("assistant"):
+        try:
+            msg = st.write_stream(timed_stream(client.stream(
+                model=CHAT_MODEL,
+                messages=build_request_messages()
+            ), metrics))
+        except openai.OpenAIError as e:
+            st.error(f"The AI service is unavailable right now, please try again shortly.\nError: {e}")
+            st.stop()
+    # Append the assistant's full response
     st.session_state.messages.append({"role": "assistant", "content": msg})
-    st.chat_message("assistant").write(msg)
+    st.session_state.setdefault("latency_metrics", []).append(metrics)
+
+# Show response latency for this session
+if st.session_state.get("latency_metrics"):
+    latest = st.session_state["latency_metrics"][-1]
+    ttfts = [m["time_to_first_token"] for m in st.session_state["latency_metrics"] if "time_to_first_token" in m]
+    st.sidebar.divider()
+    st.sidebar.caption("Response Latency")
+    if "time_to_first_token" in latest:
+        st.sidebar.caption(f"First token: {latest['time_to_first_token']:.2f}s (avg {sum(ttfts) / len(ttfts):.2f}s)")
+    st.sidebar.caption(f"Full response: {latest['total_time']:.2f}s")
@@ -0,0 +1,196 @@
+"""
+Offline trainer for the scheduler's engagement scorer.
+
+Fits a small ridge regression of log reach on post features from post_analysis
+that generated ideas also have (main theme, post type and caption length) and
+tabulates average reach by weekday and hour, then writes both to
+engagement_models/<page_id>.json. The scheduler pages load that file to rank
+candidate post ideas and pick posting slots locally before saving them.
+
+Usage (from the repo root, so config.json and .streamlit/secrets.toml resolve):
+    python engagement_model.py --tenant smp
+    python engagement_model.py --all
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+import streamlit as st
+from google.oauth2 import service_account
+from google.cloud import bigquery
+import numpy as np
+import pandas as pd
+
+# Tenants a model can be trained for
+TENANTS = {
+    "smp": {"account_name": "Sterling Mental Performance", "page_id": 17841467554159158},
+    "fv": {"account_name": "Fuel Vault", "page_id": 17841467121671609},
+    "hv": {"account_name": "The Harborview", "page_id": 17841410640947509},
+}
+
+MODEL_DIR = "engagement_models"
+RIDGE_PENALTY = 1.0
+MIN_TRAINING_ROWS = 20
+MIN_SLOT_POSTS = 2  # posts needed in a weekday/hour slot before its average reach is trusted
+
+# Instagram media types mapped onto the scheduler's post types
+POST_TYPES = {"VIDEO": "Reel", "IMAGE": "Static Post", "CAROUSEL_ALBUM": "Static Post"}
+
+# Only features a candidate idea has before it is scheduled. Timing is handled by slot_reach,
+# and polarity comes from the analysis pipeline, so the scheduler can't compute it for an idea.
+CATEGORICAL_FEATURES = ["main_theme", "post_type"]
+NUMERIC_FEATURES = ["caption_length"]
+
+# Load the configuration file
+def load_config(file_path="config.json"):
+    with open(file_path, "r") as f:
+        return json.load(f)
+
+# Load the account configuration
+config = load_config()
+
+PROJECT_ID = config["PROJECT_ID"]
+DATASET_ID = config["DATASET_ID"]
+POST_TABLE_ID = config["POST_TABLE_ID"]
+ANALYSIS_TABLE_ID = config["ANALYSIS_TABLE_ID"]
+
+# Load credentials from st.secrets (reads .streamlit/secrets.toml outside of `streamlit run`)
+credentials = service_account.Credentials.from_service_account_info(
+    st.secrets["gcp_service_account"]
+)
+
+bq_client = bigquery.Client(credentials=credentials, project=PROJECT_ID)
+
+
+def fetch_data(query: str, page_id: int) -> pd.DataFrame:
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter("page_id", "INT64", page_id)]
+    )
+    query_job = bq_client.query(query, job_config=job_config)
+    return query_job.result().to_dataframe()
+
+
+def load_training_data(page_id):
+    """One row per analysed post with its features and reach."""
+    query = f"""
+    SELECT
+        a.video_id,
+        ANY_VALUE(a.main_theme) AS main_theme,
+        ANY_VALUE(a.caption_length) AS caption_length,
+        ANY_VALUE(a.created_time) AS created_time,
+        ANY_VALUE(p.media_type) AS media_type,
+        MAX(p.reach) AS reach  -- postdata holds a snapshot per day, keep the latest reach
+    FROM `{PROJECT_ID}.{DATASET_ID}.{ANALYSIS_TABLE_ID}` a
+    JOIN `{PROJECT_ID}.{DATASET_ID}.{POST_TABLE_ID}` p
+        ON p.post_id = a.video_id AND p.page_id = a.page_id
+    WHERE a.page_id = @page_id AND p.reach IS NOT NULL
+    GROUP BY a.video_id
+    """
+    data = fetch_data(query, page_id)
+
+    data["post_type"] = data["media_type"].map(POST_TYPES)
+    created_time = pd.to_datetime(data["created_time"])
+    data["hour"] = created_time.dt.hour
+    data["weekday"] = created_time.dt.weekday
+    return data
+
+
+def build_slot_reach(data):
+    """Average reach per weekday (0 is Monday) and hour, for slots with enough posts."""
+    slots = data.groupby(["weekday", "hour"])["reach"].agg(["mean", "count"]).reset_index()
+    slots = slots[slots["count"] >= MIN_SLOT_POSTS]
+
+    slot_reach = {}
+    for row in slots.itertuples():
+        slot_reach.setdefault(str(row.weekday), {})[str(row.hour)] = float(row.mean)
+    return slot_reach
+
+
+def train_model(data):
+    """
+    Fit a ridge regression of log1p(reach) on one-hot categorical and standardized numeric features.
+
+    Categorical levels missing at scoring time fall back to the level weights averaged by
+    how often each level appeared in training, and numeric features to their training mean.
+    """
+    columns, blocks, model = [], [], {"categorical": {}, "numeric": {}}
+
+    for feature in CATEGORICAL_FEATURES:
+        values = data[feature].fillna("Unknown").astype(str)
+        levels = sorted(values.unique())
+        columns += [(feature, level) for level in levels]
+        blocks.append(pd.get_dummies(values).reindex(columns=levels, fill_value=0).to_numpy(dtype=float))
+
+    for feature in NUMERIC_FEATURES:
+        values = pd.to_numeric(data[feature], errors="coerce")
+        mean, std = float(values.mean()), float(values.std() or 1.0)
+        model["numeric"][feature] = {"mean": mean, "std": std}
+        columns.append((feature, None))
+        blocks.append(((values.fillna(mean) - mean) / std).to_numpy(dtype=float).reshape(-1, 1))
+
+    X = np.hstack(blocks)
+    y = np.log1p(data["reach"].astype(float).to_numpy())
+    intercept = float(y.mean())
+
+    # Closed-form ridge on the centred target, so the penalty doesn't shrink the intercept
+    weights = np.linalg.solve(X.T @ X + RIDGE_PENALTY * np.eye(X.shape[1]), X.T @ (y - intercept))
+    model["intercept"] = intercept
+
+    for (feature, level), weight in zip(columns, weights):
+        if level is None:
+            model["numeric"][feature]["weight"] = float(weight)
+        else:
+            model["categorical"].setdefault(feature, {"weights": {}})["weights"][level] = float(weight)
+
+    for feature in CATEGORICAL_FEATURES:
+        frequencies = data[feature].fillna("Unknown").astype(str).value_counts(normalize=True)
+        level_weights = model["categorical"][feature]["weights"]
+        model["categorical"][feature]["default"] = float(sum(level_weights[level] * share for level, share in frequencies.items()))
+
+    predictions = X @ weights + intercept
+    model["training_rmse"] = float(np.sqrt(np.mean((predictions - y) ** 2)))
+    return model
+
+
+def train_tenant_model(tenant):
+    """Train and save the engagement model for one tenant. Returns the file written."""
+    page_id = TENANTS[tenant]["page_id"]
+    data = load_training_data(page_id)
+    if len(data) < MIN_TRAINING_ROWS:
+        raise ValueError(f"only {len(data)} analysed posts, need at least {MIN_TRAINING_ROWS}")
+
+    model = train_model(data)
+    model["slot_reach"] = build_slot_reach(data)
+    model.update({"page_id": page_id, "rows": len(data), "trained_at": datetime.now().isoformat(timespec="seconds")})
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    path = os.path.join(MODEL_DIR, f"{page_id}.json")
+    with open(path, "w") as f:
+        json.dump(model, f, indent=2)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the scheduler's engagement scorer.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--tenant", choices=sorted(TENANTS), help="Train the model for a single tenant.")
+    group.add_argument("--all", action="store_true", help="Train models for every tenant.")
+    args = parser.parse_args()
+
+    tenants = sorted(TENANTS) if args.all else [args.tenant]
+    failed = []
+    for tenant in tenants:
+        try:
+            print(f"[{tenant}] wrote {train_tenant_model(tenant)}")
+        except Exception as e:
+            # Keep going so one tenant without enough data doesn't block the rest
+            print(f"[{tenant}] failed: {e}")
+            failed.append(tenant)
+
+    if failed:
+        raise SystemExit(f"Training failed for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 import streamlit as st
 from streamlit_calendar import calendar
-import openai
 from google.oauth2 import service_account
 from google.cloud import bigquery
 import pandas as pd
 from datetime import datetime, date, timedelta
 import json
 from zoneinfo import ZoneInfo
+import os
+import sys
+
+# Shared modules live at the repo root, one level above this page
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_gateway import LLMGateway, LLMResponseCache
 # from styles import *
 
 #For Viz
@@ -62,10 +67,14 @@ credentials = service_account.Credentials.from_service_account_info(
 client = bigquery.Client(credentials=credentials, project=PROJECT_ID)
 
 # OpenAI key
-openai.api_key = st.secrets["openai"]["api_key"]
+openai_api_key = st.secrets["openai"]["api_key"]
+
+@st.cache_resource
+def get_llm_gateway(api_key):
+    return LLMGateway(api_key, cache=LLMResponseCache())
 
 # Initialize OpenAI client
-AI_client = openai
+AI_client = get_llm_gateway(openai_api_key)
 
 # Get Business Description
 def pull_busdescritpion(dataset_id, table_id):
@@ -366,7 +375,7 @@ def generate_gpt_summary(static_summary, business_description):
 
     try:
         # Call ChatGPT using the updated syntax
-        response = AI_client.chat.completions.create(
+        response = AI_client.create(
             model="gpt-4o-mini",
             messages=[
                 {
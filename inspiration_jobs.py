@@ -0,0 +1,115 @@
+"""
+Processing status for inspiration uploads.
+
+InspirationJobQueue tracks each recorded upload through uploaded, queued,
+analyzing and done (or failed). A single poller thread moves queued jobs to
+analyzing and asks a check function, once per poll for every analyzing job,
+which of them the analysis pipeline has finished. Each inspiration page keeps
+one queue per process with st.cache_resource:
+
+    from inspiration_jobs import InspirationJobQueue, local_stand_in_analysis
+
+    @st.cache_resource
+    def get_job_queue():
+        return InspirationJobQueue(local_stand_in_analysis if INSPO_LOCAL_WORKER else check_analysis_done)
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Poller settings
+ANALYSIS_POLL_SECONDS = 20
+ANALYSIS_TIMEOUT = timedelta(minutes=30)
+JOB_RETENTION = timedelta(hours=1)  # How long finished jobs stay listed
+LOCAL_ANALYSIS_SECONDS = 10
+
+
+def local_stand_in_analysis(jobs, seconds=LOCAL_ANALYSIS_SECONDS, now=datetime.now):
+    """Stand-in check for local runs and tests: a video counts as analysed once it has been analyzing for `seconds`."""
+    return {job["video_id"] for job in jobs if now() - job["analyzing_since"] >= timedelta(seconds=seconds)}
+
+
+class InspirationJobQueue:
+    """
+    In-process tracker for uploads waiting on the analysis pipeline. Jobs are
+    checked together, so one query per poll covers every analyzing upload, and a
+    job that isn't analysed within the timeout fails and can be retried.
+    """
+
+    def __init__(self, check, poll_interval=ANALYSIS_POLL_SECONDS, timeout=ANALYSIS_TIMEOUT,
+                 retention=JOB_RETENTION, now=datetime.now):
+        self.check = check
+        self.timeout = timeout
+        self.retention = retention
+        self.now = now
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._jobs = {}
+        threading.Thread(target=self._run, args=(poll_interval,), daemon=True).start()
+
+    def submit(self, page_id, video_id, file_name):
+        """Start tracking a recorded upload. A video that is already tracked is left as it is."""
+        with self._lock:
+            if video_id in self._jobs:
+                return
+            self._jobs[video_id] = {"page_id": page_id, "video_id": video_id, "file_name": file_name,
+                                    "state": "uploaded", "error": None, "updated_at": self.now(), "analyzing_since": None}
+            self._set_state(self._jobs[video_id], "queued")
+
+    def retry(self, video_id):
+        """Queue a failed job again, giving the pipeline another full timeout to finish it."""
+        with self._lock:
+            job = self._jobs.get(video_id)
+            if job and job["state"] == "failed":
+                self._set_state(job, "queued")
+
+    def _set_state(self, job, state, error=None):
+        job.update(state=state, error=error, updated_at=self.now())
+        if state == "analyzing":
+            job["analyzing_since"] = job["updated_at"]
+
+    def poll(self):
+        """Move queued jobs to analyzing, then check every analyzing job in one call."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job["state"] == "queued":
+                    self._set_state(job, "analyzing")
+            analyzing = [dict(job) for job in self._jobs.values() if job["state"] == "analyzing"]
+        if not analyzing:
+            return
+
+        try:
+            finished = self.check(analyzing)
+            self.last_error = None
+        except Exception as e:
+            # Keep waiting, the next poll tries again and the timeout still applies
+            finished = set()
+            self.last_error = e
+
+        with self._lock:
+            for snapshot in analyzing:
+                job = self._jobs.get(snapshot["video_id"])
+                if not job or job["state"] != "analyzing":
+                    continue
+                if job["video_id"] in finished:
+                    self._set_state(job, "done")
+                elif self.now() - job["analyzing_since"] >= self.timeout:
+                    self._set_state(job, "failed", error=f"No analysis after {int(self.timeout.total_seconds() // 60)} minutes")
+
+    def jobs(self, page_id):
+        """The page's jobs, newest first. Finished jobs drop off after the retention period."""
+        cutoff = self.now() - self.retention
+        with self._lock:
+            for video_id in [video_id for video_id, job in self._jobs.items()
+                             if job["state"] in ("done", "failed") and job["updated_at"] < cutoff]:
+                del self._jobs[video_id]
+            jobs = [dict(job) for job in self._jobs.values() if job["page_id"] == page_id]
+        return sorted(jobs, key=lambda job: job["updated_at"], reverse=True)
+
+    def _run(self, poll_interval):
+        while True:
+            time.sleep(poll_interval)
+            try:
+                self.poll()
+            except Exception as e:
+                self.last_error = e
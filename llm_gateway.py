@@ -0,0 +1,199 @@
+"""
+Shared LLM gateway for the Streamlit pages.
+
+LLMGateway wraps the OpenAI chat API with bounded concurrency, token-bucket
+rate limiting and jittered exponential backoff, and answers repeated requests
+from LLMResponseCache, a SQLite-backed LRU cache of completions. Each page
+keeps one gateway per process with st.cache_resource:
+
+    from llm_gateway import LLMGateway, LLMResponseCache
+
+    @st.cache_resource
+    def get_llm_gateway(api_key):
+        return LLMGateway(api_key, cache=LLMResponseCache())
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import openai
+from openai.types.chat import ChatCompletion
+
+# Gateway defaults, one gateway is shared by every session of an app
+LLM_MAX_CONCURRENCY = 4
+LLM_REQUESTS_PER_MINUTE = 60
+LLM_MAX_RETRIES = 4
+LLM_TIMEOUT = 60  # seconds
+LLM_CACHE_PATH = ".llm_cache.sqlite"
+LLM_CACHE_MAX_ENTRIES = 2000
+# Set LLM_CACHE_REPLAY=1 to serve only cached responses, e.g. for offline tests
+LLM_CACHE_REPLAY = os.environ.get("LLM_CACHE_REPLAY") == "1"
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of chat completions keyed on a hash of the request
+    (model, messages, temperature and any other options), with LRU eviction
+    once it holds more than max_entries responses.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(request):
+        payload = json.dumps(request, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return ChatCompletion.model_validate_json(row[0])
+
+    def put(self, key, response):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, last_used) VALUES (?, ?, ?)",
+                (key, response.model_dump_json(), time.time())
+            )
+            # Evict the least recently used responses beyond the size bound
+            self._db.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            self._db.commit()
+
+
+class LLMGateway:
+    """
+    Async OpenAI client with bounded concurrency, token-bucket rate limiting
+    and jittered exponential backoff on rate-limit, timeout and server errors.
+    """
+
+    RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+    def __init__(self, api_key, max_concurrency=LLM_MAX_CONCURRENCY, requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                 max_retries=LLM_MAX_RETRIES, timeout=LLM_TIMEOUT, cache=None):
+        self.api_key = api_key
+        self.cache = cache
+        self.max_retries = max_retries
+        self.timeout = timeout
+        # Thread-level primitives so the limits hold across sessions, which each run their own event loop
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._rate = requests_per_minute / 60.0
+        self._capacity = float(max_concurrency)
+        self._tokens = self._capacity
+        self._last_refill = time.monotonic()
+
+    def _reserve_token(self):
+        """Take a token from the bucket and return how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._rate)
+            self._last_refill = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self._rate
+
+    async def _acquire_slot(self):
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(0.05)
+
+    def _backoff(self, attempt, error):
+        # Full jitter, but never retry sooner than the server asked us to
+        delay = random.uniform(0, min(30, 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    async def acreate(self, use_cache=True, **kwargs):
+        """
+        Async chat completion, takes the same arguments as chat.completions.create.
+
+        Identical requests are answered from the response cache. Pass use_cache=False
+        for creative, high-temperature calls that should vary between runs.
+        """
+        key = LLMResponseCache.make_key(kwargs) if use_cache and self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            if LLM_CACHE_REPLAY:
+                raise LookupError("No cached LLM response for this request and LLM_CACHE_REPLAY is set.")
+
+        response = await self._request(**kwargs)
+
+        if key is not None:
+            self.cache.put(key, response)
+        return response
+
+    async def _request(self, **kwargs):
+        async with openai.AsyncOpenAI(api_key=self.api_key, timeout=self.timeout, max_retries=0) as llm:
+            for attempt in range(self.max_retries + 1):
+                await asyncio.sleep(self._reserve_token())
+                await self._acquire_slot()
+                try:
+                    return await llm.chat.completions.create(**kwargs)
+                except self.RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self._backoff(attempt, e)
+                finally:
+                    self._slots.release()
+                await asyncio.sleep(delay)
+
+    def create(self, **kwargs):
+        """Blocking wrapper for use from the Streamlit script."""
+        return asyncio.run(self.acreate(**kwargs))
+
+    def create_many(self, requests, use_cache=True):
+        """Run several chat completions concurrently, returning responses (or exceptions) in request order."""
+        async def run_all():
+            return await asyncio.gather(*(self.acreate(use_cache=use_cache, **request) for request in requests), return_exceptions=True)
+        return asyncio.run(run_all())
+
+    def stream(self, **kwargs):
+        """
+        Stream a chat completion as text chunks, e.g. for st.write_stream.
+
+        Shares the gateway's limits, but retries only happen before the first
+        chunk arrives and streamed responses are not cached.
+        """
+        with openai.OpenAI(api_key=self.api_key, timeout=self.timeout, max_retries=0) as llm:
+            for attempt in range(self.max_retries + 1):
+                time.sleep(self._reserve_token())
+                self._slots.acquire()
+                started = False
+                try:
+                    for chunk in llm.chat.completions.create(stream=True, **kwargs):
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            started = True
+                            yield chunk.choices[0].delta.content
+                    return
+                except self.RETRYABLE_ERRORS as e:
+                    if started or attempt == self.max_retries:
+                        raise
+                    delay = self._backoff(attempt, e)
+                finally:
+                    self._slots.release()
+                time.sleep(delay)
@@ -0,0 +1,164 @@
+"""
+Write-behind queue for the scheduler pages' post idea edits.
+
+Inserts, updates and deletes are journaled to a local SQLite file and
+coalesced per idea, then a background thread flushes them to the postideas
+table in BigQuery as one MERGE per page. After each flush, on_flush is called
+with the page's flushed edits and its version (latest update time and idea
+count) from just before and just after the MERGE. Each scheduler page keeps one queue
+per process with st.cache_resource:
+
+    from mutation_queue import MutationQueue, STORED_FIELDS
+
+    @st.cache_resource
+    def get_mutation_queue():
+        return MutationQueue(bq_client, on_flush=on_ideas_flushed)
+"""
+import json
+import sqlite3
+import threading
+import time
+
+from google.cloud import bigquery
+
+# Write-behind settings for post idea edits
+MUTATION_JOURNAL_PATH = ".scheduler_journal.sqlite"
+MUTATION_FLUSH_INTERVAL = 30  # seconds
+
+# Idea columns written to postideas besides page_id and idea_id
+STORED_FIELDS = ["date", "post_time", "post_summary", "caption", "post_type", "themes", "tone", "source"]
+
+
+class MutationQueue:
+    """
+    Write-behind queue for post idea edits. Edits are journaled to SQLite so
+    they survive a restart and coalesced per idea (the latest edit wins), and a
+    background thread flushes them to BigQuery as one MERGE per page.
+    """
+
+    def __init__(self, bq_client, path=MUTATION_JOURNAL_PATH, flush_interval=MUTATION_FLUSH_INTERVAL, on_flush=None):
+        self.bq_client = bq_client
+        self.on_flush = on_flush
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS mutations (page_id INTEGER NOT NULL, idea_id TEXT NOT NULL, op TEXT NOT NULL, "
+            "row TEXT, version INTEGER NOT NULL, PRIMARY KEY (page_id, idea_id))"
+        )
+        self._db.commit()
+        threading.Thread(target=self._run, args=(flush_interval,), daemon=True).start()
+
+    def enqueue(self, page_id, idea_id, op, row=None):
+        """Journal an 'insert', 'update' or 'delete' for one idea, folding it into any edit still pending."""
+        self.enqueue_many(page_id, [(idea_id, op, row)])
+
+    def enqueue_many(self, page_id, changes):
+        """Journal several (idea_id, op, row) edits for a page in one transaction."""
+        with self._lock:
+            for idea_id, op, row in changes:
+                pending = self._db.execute(
+                    "SELECT op FROM mutations WHERE page_id = ? AND idea_id = ?", (page_id, idea_id)
+                ).fetchone()
+                # An update folds into a pending insert. A delete replaces it instead of dropping it, since
+                # the insert may already be in BigQuery (see _merge), and deleting a missing row is a no-op
+                if pending and pending[0] == "insert" and op != "delete":
+                    op = "insert"
+                self._db.execute(
+                    "INSERT OR REPLACE INTO mutations (page_id, idea_id, op, row, version) VALUES (?, ?, ?, ?, ?)",
+                    (page_id, idea_id, op, json.dumps(row) if row is not None else None, time.time_ns())
+                )
+            self._db.commit()
+
+    def pending(self, page_id):
+        """Return {idea_id: (op, row)} for the edits not yet flushed for a page."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT idea_id, op, row FROM mutations WHERE page_id = ?", (page_id,)
+            ).fetchall()
+        return {idea_id: (op, json.loads(row) if row else None) for idea_id, op, row in rows}
+
+    def flush(self):
+        """Apply every pending edit, one MERGE per page. Edits made while a MERGE runs stay queued."""
+        with self._flush_lock:
+            with self._lock:
+                rows = self._db.execute("SELECT page_id, idea_id, op, row, version FROM mutations").fetchall()
+
+            by_page = {}
+            for page_id, idea_id, op, row, version in rows:
+                by_page.setdefault(page_id, []).append((idea_id, op, json.loads(row) if row else {}, version))
+
+            for page_id, changes in by_page.items():
+                try:
+                    versions = self._merge(page_id, changes)
+                except Exception as e:
+                    self.last_error = e
+                    continue
+                with self._lock:
+                    self._db.executemany(
+                        "DELETE FROM mutations WHERE page_id = ? AND idea_id = ? AND version = ?",
+                        [(page_id, idea_id, version) for idea_id, _, _, version in changes]
+                    )
+                    self._db.commit()
+                self.last_error = None
+                if self.on_flush:
+                    self.on_flush(page_id, {idea_id: (op, row) for idea_id, op, row, _ in changes}, versions)
+
+    def _merge(self, page_id, changes):
+        """Run the page's MERGE and return its ((updated_at, idea_count) before, (updated_at, idea_count) after)."""
+        # An insert can reach BigQuery and still be journaled, when the app stops before
+        # the journal is cleared or an edit was folded into it while the MERGE ran.
+        # Replaying it updates the existing row instead, so no edit is lost.
+        # The versions are read in the same script, so callers can keep a snapshot current without reloading it
+        query = f"""
+            DECLARE previous STRUCT<updated_at TIMESTAMP, idea_count INT64> DEFAULT (
+                SELECT AS STRUCT MAX(updated_at) AS updated_at, COUNT(*) AS idea_count
+                FROM `bizbuddydemo-v2.strategy_data.postideas`
+                WHERE page_id = @page_id
+            );
+
+            MERGE `bizbuddydemo-v2.strategy_data.postideas` T
+            USING UNNEST(@changes) S
+            ON T.page_id = @page_id AND T.idea_id = S.idea_id
+            WHEN MATCHED AND S.op = 'delete' THEN DELETE
+            WHEN MATCHED AND S.op IN ('insert', 'update') THEN UPDATE SET
+                {", ".join(f"{field} = S.{field}" for field in STORED_FIELDS)}, updated_at = CURRENT_TIMESTAMP()
+            WHEN NOT MATCHED AND S.op = 'insert' THEN
+                INSERT (page_id, idea_id, {", ".join(STORED_FIELDS)}, updated_at)
+                VALUES (@page_id, S.idea_id, {", ".join(f"S.{field}" for field in STORED_FIELDS)}, CURRENT_TIMESTAMP());
+
+            SELECT
+                previous.updated_at AS previous_updated_at,
+                previous.idea_count AS previous_idea_count,
+                MAX(updated_at) AS updated_at,
+                COUNT(*) AS idea_count
+            FROM `bizbuddydemo-v2.strategy_data.postideas`
+            WHERE page_id = @page_id;
+        """
+        change_params = [
+            bigquery.StructQueryParameter(
+                None,
+                bigquery.ScalarQueryParameter("idea_id", "STRING", idea_id),
+                bigquery.ScalarQueryParameter("op", "STRING", op),
+                *[bigquery.ScalarQueryParameter(field, "STRING", row.get(field)) for field in STORED_FIELDS],
+            )
+            for idea_id, op, row, _ in changes
+        ]
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("page_id", "INT64", page_id),
+                bigquery.ArrayQueryParameter("changes", "STRUCT", change_params),
+            ]
+        )
+        # A script's result is its last statement's
+        row = list(self.bq_client.query(query, job_config=job_config).result())[0]
+        return (str(row.previous_updated_at), row.previous_idea_count), (str(row.updated_at), row.idea_count)
+
+    def _run(self, flush_interval):
+        while True:
+            time.sleep(flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                self.last_error = e
@@ -4,6 +4,8 @@ from google.cloud import bigquery
 import pandas as pd
 from datetime import date, timedelta
 import plotly.express as px
+import pyarrow as pa
+import pyarrow.compute as pc
 import json
 
 # For wordcloud
@@ -41,12 +43,13 @@ credentials = service_account.Credentials.from_service_account_info(
 )
 project_id = st.secrets["gcp_service_account"]["project_id"]
 
-# Function to fetch data from BigQuery
-def fetch_data(query: str) -> pd.DataFrame:
+# Cached Arrow copy of a query result, shared by the charts and the raw data explorer
+@st.cache_data(ttl=3600)
+def fetch_arrow_table(query: str) -> pa.Table:
     client = bigquery.Client(credentials=credentials, project=project_id)
     query_job = client.query(query)  # Make a query request
     result = query_job.result()  # Wait for the query to finish
-    return result.to_dataframe()
+    return result.to_arrow()
 
 # Define filter functions
 def filter_last_30_days(df):
@@ -60,6 +63,84 @@ def filter_last_6_months(df):
 def top_10_by_column(df, column):
     return df.sort_values(by=column, ascending=False).head(10)
 
+def is_browsable(field_type):
+    # Nested columns (lists, structs) can't be searched or sorted as plain values
+    return not (pa.types.is_nested(field_type) or pa.types.is_binary(field_type))
+
+def filter_arrow_table(table, column, text):
+    # Case-insensitive "contains" match, evaluated in Arrow without converting to pandas
+    values = pc.cast(table[column], pa.string())
+    mask = pc.fill_null(pc.match_substring(values, text, ignore_case=True), False)
+    return table.filter(mask)
+
+def page_of_arrow_table(table, columns, sort_column, ascending, page_number, page_size):
+    # Sort by index and only take the rows for the requested page
+    offset = (page_number - 1) * page_size
+    if sort_column:
+        order = "ascending" if ascending else "descending"
+        indices = pc.sort_indices(table, sort_keys=[(sort_column, order)])
+        page = table.take(indices.slice(offset, page_size))
+    else:
+        page = table.slice(offset, page_size)
+    return page.select(columns)
+
+def reset_raw_page():
+    st.session_state["raw_page_number"] = 1
+
+def display_raw_data_explorer(query):
+    """
+    Page through the cached analysis table as Arrow batches.
+
+    Nothing is loaded until the user switches the explorer on, and sorting,
+    filtering and column selection run against the cached Arrow table so only
+    the visible page is sent to the browser.
+    """
+    st.subheader("Raw Data")
+
+    if not st.toggle("Explore raw data", key="raw_data_toggle"):
+        return
+
+    table = fetch_arrow_table(query)
+    browsable = [field.name for field in table.schema if is_browsable(field.type)]
+
+    columns = st.multiselect("Columns", table.column_names, default=table.column_names[:10], key="raw_columns")
+    if not columns:
+        st.info("Select at least one column to display.")
+        return
+
+    col_filter, col_text, col_sort, col_order = st.columns(4)
+    with col_filter:
+        filter_column = st.selectbox("Filter Column", ["None"] + browsable, key="raw_filter_column", on_change=reset_raw_page)
+    with col_text:
+        filter_text = st.text_input("Contains", key="raw_filter_text", on_change=reset_raw_page)
+    with col_sort:
+        sort_column = st.selectbox("Sort By", ["None"] + browsable, key="raw_sort_column")
+    with col_order:
+        ascending = st.radio("Order", ["Descending", "Ascending"], horizontal=True, key="raw_sort_order") == "Ascending"
+
+    if filter_column != "None" and filter_text:
+        table = filter_arrow_table(table, filter_column, filter_text)
+
+    col_size, col_page = st.columns(2)
+    with col_size:
+        page_size = st.selectbox("Rows per Page", [25, 50, 100, 250], key="raw_page_size", on_change=reset_raw_page)
+    page_count = max(1, -(-table.num_rows // page_size))
+    if st.session_state.get("raw_page_number", 1) > page_count:
+        reset_raw_page()  # The data behind the filter changed since the page was picked
+    with col_page:
+        page_number = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="raw_page_number")
+
+    page = page_of_arrow_table(
+        table,
+        columns,
+        None if sort_column == "None" else sort_column,
+        ascending,
+        int(page_number),
+        page_size,
+    )
+    st.dataframe(page)
+    st.caption(f"Page {int(page_number)} of {page_count} ({table.num_rows:,} matching rows)")
+
 # Use the variables in your app
 account_name = config["ACCOUNT_NAME"]
 datasetid = config["TESTING_DATASET_ID"]
@@ -73,10 +154,14 @@ WHERE page_id = 17841467554159158
 ORDER BY created_time DESC
 """
 
-# Load/Transform Data
-data = fetch_data(query)
-data['post_date'] = data['created_time'].dt.date
-data = data.drop_duplicates()
+# Load/Transform Data from the same cached Arrow table the explorer reads
+@st.cache_data(ttl=3600)
+def load_data(query: str) -> pd.DataFrame:
+    data = fetch_arrow_table(query).to_pandas()
+    data['post_date'] = data['created_time'].dt.date
+    return data.drop_duplicates()
+
+data = load_data(query)
 
 def main():
     st.title("Social Buddy 🚀 - Post Deep Dive")
@@ -226,8 +311,7 @@ def main():
         )
         st.plotly_chart(fig_subjectivity)
 
-    st.subheader("Raw Data")
-    st.dataframe(data)
+    display_raw_data_explorer(query)
 
 if __name__ == "__main__":
     main()
@@ -5,6 +5,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 import openai
 import json
+from llm_gateway import LLMGateway, LLMResponseCache
 
 st.set_page_config(page_title="Post Scheduler", layout="wide", page_icon = "🗓️")
 
@@ -44,10 +45,14 @@ credentials = service_account.Credentials.from_service_account_info(
 # Load BQ Client
 bq_client = bigquery.Client(credentials=credentials, project=PROJECT_ID)
 
-openai.api_key = st.secrets["openai"]["api_key"]
+openai_api_key = st.secrets["openai"]["api_key"]
+
+@st.cache_resource
+def get_llm_gateway(api_key):
+    return LLMGateway(api_key, cache=LLMResponseCache())
 
 # Initialize OpenAI client
-client = openai
+client = get_llm_gateway(openai_api_key)
 
 
 # Function to fetch the latest date and calculate the next post date
@@ -67,6 +72,111 @@ def fetch_latest_date():
     latest_date = result.to_dataframe().iloc[0]["latest_date"]
     return latest_date + timedelta(days=3)
 
+# Schema generated ideas are validated against
+IDEA_FIELDS = ["caption", "post_type", "themes", "tone"]
+POST_TYPES = ["Reel", "Story", "Static Post"]
+MAX_CAPTION_LENGTH = 2200  # Instagram's caption limit
+IDEA_REPAIR_ATTEMPTS = 2
+
+def coerce_text(value):
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return value.strip()
+
+def coerce_caption(value):
+    caption = coerce_text(value)
+    return caption if caption and len(caption) <= MAX_CAPTION_LENGTH else None
+
+def coerce_post_type(value):
+    text = str(value or "").lower()
+    if "reel" in text or "video" in text:
+        return "Reel"
+    if "story" in text:
+        return "Story"
+    if any(word in text for word in ("static", "image", "photo", "carousel", "post")):
+        return "Static Post"
+    return None
+
+def coerce_list(value):
+    # Models return lists or comma-separated strings
+    if isinstance(value, str):
+        value = value.strip().strip("[]").split(",")
+    if not isinstance(value, list):
+        return None
+    items = [str(item).strip().strip("\"'") for item in value if str(item).strip()]
+    return items or None
+
+# field -> (coercer returning the cleaned value or None, description used in prompts)
+IDEA_SCHEMA = {
+    "caption": (coerce_caption, f"the full caption, at most {MAX_CAPTION_LENGTH} characters"),
+    "post_type": (coerce_post_type, f"one of {', '.join(POST_TYPES)}"),
+    "themes": (coerce_list, "a list of short themes from the strategy"),
+    "tone": (coerce_list, "a list of tone words"),
+}
+
+def describe_idea_schema(fields=IDEA_FIELDS):
+    return "".join(f"- **{field}**: {IDEA_SCHEMA[field][1]}\n" for field in fields)
+
+def validate_idea(raw):
+    """
+    Coerce a generated idea onto the idea schema.
+
+    Returns:
+        tuple: (the cleaned idea, list of fields that are missing or invalid)
+    """
+    raw = raw if isinstance(raw, dict) else {}
+    idea, failed = {}, []
+    for field, (coerce, _) in IDEA_SCHEMA.items():
+        value = coerce(raw.get(field))
+        if value is None:
+            failed.append(field)
+        else:
+            idea[field] = value
+    return idea, failed
+
+def build_repair_request(idea, failed):
+    """Chat request asking only for the fields of an idea that failed validation."""
+    prompt = (
+        f"Here is an Instagram post idea with some fields missing or invalid:\n{json.dumps(idea)}\n\n"
+        f"Provide values for these fields only:\n{describe_idea_schema(failed)}"
+        "Keep them consistent with the rest of the idea. Return a JSON object with exactly those keys."
+    )
+    return {
+        "model": "gpt-4o-mini",
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": "You are a social media manager completing a post idea."},
+            {"role": "user", "content": prompt}
+        ],
+    }
+
+def repair_idea(idea, failed):
+    """
+    Re-request only the failing fields of a broken idea.
+
+    Args:
+        idea (dict): The cleaned idea from validate_idea.
+        failed (list): Its failing fields.
+
+    Returns:
+        tuple: (the idea, fields that still fail after IDEA_REPAIR_ATTEMPTS)
+    """
+    for _ in range(IDEA_REPAIR_ATTEMPTS):
+        if not failed:
+            break
+        try:
+            # Uncached, so a second attempt asks again instead of getting the failed answer back
+            response = client.create(use_cache=False, **build_repair_request(idea, failed))
+            patch = json.loads(response.choices[0].message.content)
+        except (openai.OpenAIError, TypeError, json.JSONDecodeError):
+            # The request failed, had no content or wasn't JSON
+            continue
+        if not isinstance(patch, dict):
+            continue
+        idea, failed = validate_idea({**idea, **{field: patch.get(field) for field in failed}})
+
+    return idea, failed
+
 # Function to generate a single post idea
 def generate_post_idea(strategy):
     """
@@ -80,23 +190,43 @@ def generate_post_idea(strategy):
     """
     prompt = (
         f"Based on this social media strategy: {strategy}, generate 1 post idea. "
-        "Each idea should include the post Date, caption content, post type (e.g., Reel, Story, Static Post), "
-        "themes (from the strategy), and tone. Ensure that the returned JSON object only has these columns with the exact names: 'Date', 'caption', 'post_type', 'themes', 'tone', 'source'. Ensure the idea aligns with the strategy and introduces a mix of concepts. "
+        "Each idea should include:\n"
+        f"{describe_idea_schema()}"
+        "Ensure that the returned JSON object only has these keys with the exact names: 'caption', 'post_type', 'themes', 'tone'. Ensure the idea aligns with the strategy and introduces a mix of concepts. "
         "Format as a JSON object."
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a social media manager with expertise in creating engaging content."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-
-    idea_json = response.choices[0].message.content.strip()
-
-    # Convert the JSON idea to a DataFrame
-    idea_df = pd.read_json(idea_json, typ="series").to_frame().T
+    try:
+        response = client.create(
+            use_cache=False,  # Creative call, new ideas should differ every time
+            model="gpt-4o-mini",
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": "You are a social media manager with expertise in creating engaging content."},
+                {"role": "user", "content": prompt}
+            ]
+        )
+    except openai.OpenAIError as e:
+        st.error(f"The AI service is unavailable right now, please try again shortly.\nError: {e}")
+        return pd.DataFrame()
+
+    try:
+        idea_dict = json.loads(response.choices[0].message.content)
+    except (json.JSONDecodeError, TypeError) as e:
+        st.error(f"Failed to parse AI-generated post idea. Response was not valid JSON.\nError: {e}")
+        return pd.DataFrame()
+
+    # Validate against the idea schema, repairing only the fields that fail
+    idea, failed = validate_idea(idea_dict)
+    if failed:
+        idea, failed = repair_idea(idea, failed)
+    if failed:
+        st.error(f"The AI-generated post idea is missing or has invalid: {', '.join(failed)}")
+        return pd.DataFrame()
+
+    # Build the row directly so list-valued themes/tone stay in a single cell
+    idea_df = pd.DataFrame([idea], columns=IDEA_FIELDS)
+    idea_df["source"] = "ChatGPT"
 
     # Assign a date to the post
     idea_df["Date"] = fetch_latest_date()
@@ -321,9 +451,11 @@ def main():
             post_df = generate_post_idea(strategy)
 
             # Add the post to BigQuery
-            add_post_to_bigquery(post_df)
+            if not post_df.empty:
+                add_post_to_bigquery(post_df)
 
-        st.success("Post successfully added!")
+        if not post_df.empty:
+            st.success("Post successfully added!")
 
     with st.expander("Manually Add a Post:"):
         manually_add_post()
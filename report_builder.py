@@ -0,0 +1,430 @@
+"""
+Offline builder for the social media report.
+
+Renders the report for one or more tenants to a self-contained HTML file (and
+optionally a PDF), writes it locally and uploads it to the reports bucket so the
+Streamlit report page only has to serve the finished artifact.
+
+Usage (from the repo root, so config.json and .streamlit/secrets.toml resolve):
+    python report_builder.py --tenant hv
+    python report_builder.py --all --pdf
+"""
+import argparse
+import base64
+import html
+import io
+import json
+import os
+from datetime import datetime
+
+import streamlit as st
+from google.oauth2 import service_account
+from google.cloud import bigquery
+from google.cloud import storage
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# For wordcloud
+from wordcloud import WordCloud
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+# Tenants the report can be built for
+TENANTS = {
+    "smp": {"account_name": "Sterling Mental Performance", "page_id": 17841467554159158},
+    "fv": {"account_name": "Fuel Vault", "page_id": 17841467121671609},
+    "hv": {"account_name": "The Harborview", "page_id": 17841410640947509},
+}
+
+NARRATIVE_DIR = "report_narratives"
+OUTPUT_DIR = "report_output"
+
+# Load the configuration file
+def load_config(file_path="config.json"):
+    with open(file_path, "r") as f:
+        return json.load(f)
+
+# Load the account configuration
+config = load_config()
+
+PROJECT_ID = config["PROJECT_ID"]
+DATASET_ID = config["DATASET_ID"]
+POST_TABLE_ID = config["POST_TABLE_ID"]
+ANALYSIS_TABLE_ID = config["ANALYSIS_TABLE_ID"]
+ACCOUNT_TABLE_ID = config["ACCOUNT_TABLE_ID"]
+DEMOGRAPHIC_TABLE_ID = config["DEMOGRAPHIC_TABLE_ID"]
+REPORT_BUCKET = config["REPORT_BUCKET"]
+
+# Load credentials from st.secrets (reads .streamlit/secrets.toml outside of `streamlit run`)
+credentials = service_account.Credentials.from_service_account_info(
+    st.secrets["gcp_service_account"]
+)
+
+bq_client = bigquery.Client(credentials=credentials, project=PROJECT_ID)
+storage_client = storage.Client(credentials=credentials)
+
+
+def fetch_data(query: str, page_id: int) -> pd.DataFrame:
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter("page_id", "INT64", page_id)]
+    )
+    query_job = bq_client.query(query, job_config=job_config)
+    return query_job.result().to_dataframe()
+
+
+def load_narrative(tenant):
+    """Return the tenant's written narrative, or an empty dict if none has been written yet."""
+    path = os.path.join(NARRATIVE_DIR, f"{tenant}.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def assign_time_buckets(df):
+    df["hour"] = pd.to_datetime(df["created_time_og"]).dt.hour
+
+    def bucketize(hour):
+        if 9 <= hour < 12:
+            return f"{hour} AM"
+        elif hour == 12:
+            return "12 PM"
+        elif 13 <= hour <= 23:
+            return f"{hour - 12} PM"
+        elif hour == 0:
+            return "12 AM"
+        else:
+            return "1-8 AM"
+
+    time_bucket_order = [
+        "9 AM", "10 AM", "11 AM", "12 PM", "1 PM", "2 PM", "3 PM", "4 PM", "5 PM",
+        "6 PM", "7 PM", "8 PM", "9 PM", "10 PM", "11 PM", "12 AM", "1-8 AM"
+    ]
+    df["time_bucket"] = pd.Categorical(df["hour"].apply(bucketize), categories=time_bucket_order, ordered=True)
+
+    return df.drop(columns=["hour"])
+
+
+def load_report_data(page_id):
+    """Pull and merge everything the report needs for one page."""
+    post_query = f"""
+    SELECT *
+    FROM `{PROJECT_ID}.{DATASET_ID}.{POST_TABLE_ID}`
+    WHERE page_id = @page_id
+    AND DATE(insert_date) = DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY)
+    ORDER BY created_time DESC
+    """
+    analysis_query = f"""
+    SELECT *
+    FROM `{PROJECT_ID}.{DATASET_ID}.{ANALYSIS_TABLE_ID}`
+    WHERE page_id = @page_id
+    ORDER BY created_time DESC
+    """
+    account_query = f"SELECT * FROM `{PROJECT_ID}.{DATASET_ID}.{ACCOUNT_TABLE_ID}` WHERE page_id = @page_id"
+    demo_query = f"SELECT * FROM `{PROJECT_ID}.{DATASET_ID}.{DEMOGRAPHIC_TABLE_ID}` WHERE page_id = @page_id"
+
+    post_data = fetch_data(post_query, page_id)
+    post_data["created_time_og"] = post_data["created_time"]
+
+    analysis_data = fetch_data(analysis_query, page_id)
+
+    merged_data = post_data.merge(
+        analysis_data, left_on="post_id", right_on="video_id", how="left", suffixes=("_posts", "_aps")
+    )
+    merged_data = merged_data.drop(
+        columns=["reach_aps", "like_count_aps", "comments_count_aps", "shares_aps", "saved_aps", "created_time_aps"],
+        errors="ignore"
+    )
+    merged_data = assign_time_buckets(merged_data)
+    merged_data = merged_data.rename(columns={"reach_posts": "reach", "like_count_posts": "like_count", "comments_count_posts": "comments_count", "shares_posts": "shares", "saved_posts": "saved"})
+
+    account_data = fetch_data(account_query, page_id).drop_duplicates()
+    account_data = account_data.rename(columns={"total_followers": "Total Followers"})
+
+    demo_data = fetch_data(demo_query, page_id)
+
+    return merged_data, account_data, demo_data
+
+
+def build_follower_chart(account_data):
+    if account_data.empty:
+        return None
+
+    account_data = account_data.copy()
+    account_data["date"] = pd.to_datetime(account_data["date"])
+    account_data = account_data.sort_values(by="date", ascending=True)
+    full_date_range = pd.date_range(start=account_data["date"].min(), end=account_data["date"].max())
+    account_data = account_data.set_index("date").reindex(full_date_range).rename_axis("date").reset_index()
+    account_data["Total Followers"] = account_data["Total Followers"].ffill()
+
+    fig = go.Figure(go.Scatter(
+        x=account_data["date"],
+        y=account_data["Total Followers"],
+        mode="lines",
+        line=dict(color="royalblue", width=2)
+    ))
+    fig.update_layout(
+        title="Total Followers Over Time",
+        xaxis=dict(title="Date", tickformat="%b %d", tickangle=45),
+        yaxis=dict(title="Total Followers"),
+        hovermode="x unified",
+        showlegend=False,
+        template="plotly_white"
+    )
+    return fig
+
+
+def build_mean_reach_bar(df, column, title, label, horizontal=False, sort_by_reach=False):
+    data = df.groupby(column, observed=True)["reach"].mean().reset_index()
+    data = data.sort_values("reach" if sort_by_reach else column)
+    if horizontal:
+        return px.bar(data, x="reach", y=column, orientation="h", title=title,
+                      labels={column: label, "reach": "Average Reach"}, template="plotly_white")
+    return px.bar(data, x=column, y="reach", title=title,
+                  labels={column: label, "reach": "Average Reach"}, template="plotly_white")
+
+
+def build_mean_reach_scatter(df, column, title, label):
+    data = df.groupby(column).agg({"reach": "mean"}).reset_index()
+    fig = px.scatter(data, x=column, y="reach", title=title,
+                     labels={column: label, "reach": "Average Reach"}, template="plotly_white")
+    fig.update_traces(marker=dict(size=10))
+    return fig
+
+
+def build_demographic_pies(demo_data):
+    figures = []
+    for breakdown in demo_data["breakdown"].dropna().unique():
+        aggregated_df = demo_data[demo_data["breakdown"] == breakdown].groupby("value")["followers"].sum().reset_index()
+        fig = go.Figure(go.Pie(
+            labels=aggregated_df["value"],
+            values=aggregated_df["followers"],
+            hole=0.3,
+            marker=dict(colors=["#636EFA", "#EF553B", "#00CC96", "#AB63FA"]),
+            textinfo="label+percent"
+        ))
+        fig.update_layout(title_text=f"Distribution of Followers by {breakdown}", legend_title="Categories")
+        figures.append(fig)
+    return figures
+
+
+def build_wordcloud_png(merged_data):
+    """Render the speech/caption word cloud to base64 PNG, or None if there is no text."""
+    text_blob = " ".join(
+        merged_data["processed_speech"].fillna("").astype(str) + " " + merged_data["caption"].fillna("").astype(str)
+    ).strip()
+    if not text_blob:
+        return None
+
+    wordcloud = WordCloud(width=800, height=400, background_color="white", colormap="viridis").generate(text_blob)
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.imshow(wordcloud, interpolation="bilinear")
+    ax.axis("off")
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+class ReportRenderer:
+    """Collects report sections and renders them to one HTML document."""
+
+    def __init__(self, static_images=False):
+        # Static images are needed for PDF output, where plotly.js can't run
+        self.static_images = static_images
+        self.parts = []
+        self.plotly_js_included = False
+
+    def heading(self, text, level=2):
+        self.parts.append(f"<h{level}>{html.escape(text)}</h{level}>")
+
+    def paragraph(self, text):
+        if text:
+            self.parts.append(f"<p>{html.escape(text)}</p>")
+
+    def bullets(self, items):
+        if items:
+            self.parts.append("<ul>" + "".join(f"<li>{html.escape(item)}</li>" for item in items) + "</ul>")
+
+    def figure(self, fig):
+        if fig is None:
+            return
+        if self.static_images:
+            png = base64.b64encode(fig.to_image(format="png", width=900, height=500)).decode("ascii")
+            self.image(png)
+            return
+        # Inline plotly.js once so the file works offline
+        self.parts.append(
+            "<div class='figure'>"
+            + fig.to_html(full_html=False, include_plotlyjs=not self.plotly_js_included)
+            + "</div>"
+        )
+        self.plotly_js_included = True
+
+    def image(self, png_b64):
+        if png_b64:
+            self.parts.append(f"<div class='figure'><img src='data:image/png;base64,{png_b64}'/></div>")
+
+    def divider(self):
+        self.parts.append("<hr/>")
+
+    def render(self, title, subtitle):
+        return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8"/>
+<title>{html.escape(title)}</title>
+<style>
+body {{ font-family: Arial, sans-serif; max-width: 1000px; margin: 40px auto; color: #222222; }}
+h1 {{ margin-bottom: 0; }}
+.subtitle {{ color: #666666; margin-top: 4px; }}
+.figure {{ margin: 16px 0; }}
+.figure img {{ max-width: 100%; }}
+hr {{ border: none; border-top: 1px solid #dddddd; margin: 32px 0; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p class="subtitle">{html.escape(subtitle)}</p>
+{"".join(self.parts)}
+</body>
+</html>
+"""
+
+
+def build_report_html(tenant, report_data, static_images=False):
+    """Build the full report for a tenant from load_report_data() output and return it as an HTML string."""
+    account = TENANTS[tenant]
+    narrative = load_narrative(tenant)
+    merged_data, account_data, demo_data = report_data
+
+    report = ReportRenderer(static_images=static_images)
+
+    # Account overview
+    report.heading("Account Overview")
+    report.paragraph(narrative.get("overview_intro"))
+    if narrative.get("overview_highlights"):
+        report.paragraph("Here are the highlights:")
+        report.bullets(narrative["overview_highlights"])
+    report.paragraph(narrative.get("overview_outro"))
+    report.figure(build_follower_chart(account_data))
+    report.divider()
+
+    # What are we posting
+    report.heading("What are we posting?")
+    report.bullets(narrative.get("what_bullets"))
+    report.figure(build_mean_reach_bar(merged_data, "main_theme", "Average Reach by Theme", "Theme", horizontal=True, sort_by_reach=True))
+    report.heading("Most Commonly Used Words in Posts", level=3)
+    report.image(build_wordcloud_png(merged_data))
+    report.divider()
+
+    # How are we posting
+    report.heading("How are we posting?")
+    report.bullets(narrative.get("how_bullets"))
+    report.figure(build_mean_reach_bar(merged_data, "time_bucket", "Average Reach by Time of Day", "Time of Day"))
+    report.figure(build_mean_reach_bar(merged_data, "main_focus", "Average Reach by Primary Visual", "Primary Visual", horizontal=True, sort_by_reach=True))
+    report.figure(build_mean_reach_scatter(merged_data, "video_len", "Video Length vs Engagement", "Video Length"))
+    report.figure(build_mean_reach_scatter(merged_data, "object_count", "Object Count vs Engagement", "Object Count"))
+    report.divider()
+
+    # Who is seeing our posts
+    report.heading("Who is seeing our posts?")
+    report.bullets(narrative.get("who_bullets"))
+    for fig in build_demographic_pies(demo_data):
+        report.figure(fig)
+    report.divider()
+
+    # Recommendations
+    if narrative.get("recommendations"):
+        report.heading("Recommendations from Analysis")
+        report.paragraph(narrative.get("recommendations_intro"))
+        for section, items in narrative["recommendations"].items():
+            report.heading(section, level=3)
+            report.bullets(items)
+        report.paragraph(narrative.get("summary"))
+        report.divider()
+
+    # Appendix
+    report.heading("More Visuals")
+    report.figure(px.scatter(
+        merged_data,
+        x="common_word_count",
+        y="most_common_word",
+        size="reach",
+        color="theme_repetition",
+        title="Impact of Word Choice on Engagement",
+        labels={"most_common_word": "Most Common Word", "common_word_count": "Word Frequency"},
+        template="plotly_white"
+    ))
+    report.figure(build_mean_reach_bar(merged_data, "shot_count", "Average Reach by Shot Count", "Shot Count"))
+    report.figure(build_mean_reach_bar(merged_data, "polarity", "Average Reach by Polarity", "Polarity (Negative to Positive)"))
+
+    title = narrative.get("title", f"{account['account_name']} Social Report")
+    subtitle = f"Generated {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+    return report.render(title, subtitle)
+
+
+def html_to_pdf(report_html):
+    """Convert a static-image report to PDF. Needs the optional weasyprint and kaleido packages."""
+    try:
+        from weasyprint import HTML
+    except ImportError as e:
+        raise RuntimeError("PDF output requires weasyprint (and kaleido for chart images): pip install weasyprint kaleido") from e
+    return HTML(string=report_html).write_pdf()
+
+
+def publish_artifact(tenant, filename, content, content_type):
+    """Write an artifact locally and upload it to the reports bucket."""
+    local_dir = os.path.join(OUTPUT_DIR, tenant)
+    os.makedirs(local_dir, exist_ok=True)
+    local_path = os.path.join(local_dir, filename)
+    mode = "w" if isinstance(content, str) else "wb"
+    with open(local_path, mode) as f:
+        f.write(content)
+
+    blob = storage_client.bucket(REPORT_BUCKET).blob(f"{tenant}/{filename}")
+    blob.upload_from_filename(local_path, content_type=content_type)
+    return local_path
+
+
+def build_tenant_report(tenant, pdf=False):
+    report_data = load_report_data(TENANTS[tenant]["page_id"])
+
+    report_html = build_report_html(tenant, report_data)
+    paths = [publish_artifact(tenant, "social_report.html", report_html, "text/html")]
+
+    if pdf:
+        pdf_bytes = html_to_pdf(build_report_html(tenant, report_data, static_images=True))
+        paths.append(publish_artifact(tenant, "social_report.pdf", pdf_bytes, "application/pdf"))
+
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build static social media reports.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--tenant", choices=sorted(TENANTS), help="Build the report for a single tenant.")
+    group.add_argument("--all", action="store_true", help="Build reports for every tenant.")
+    parser.add_argument("--pdf", action="store_true", help="Also render a PDF copy of each report.")
+    args = parser.parse_args()
+
+    tenants = sorted(TENANTS) if args.all else [args.tenant]
+    failed = []
+    for tenant in tenants:
+        try:
+            for path in build_tenant_report(tenant, pdf=args.pdf):
+                print(f"[{tenant}] wrote {path}")
+        except Exception as e:
+            # Keep going so one broken tenant doesn't block the scheduled run
+            print(f"[{tenant}] failed: {e}")
+            failed.append(tenant)
+
+    if failed:
+        raise SystemExit(f"Report build failed for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
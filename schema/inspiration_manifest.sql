@@ -0,0 +1,30 @@
+-- Schema changes for the inspiration upload pages (`bizbuddydemo-v2.inspo_data`).
+-- Run once in the BigQuery console before deploying the pages.
+
+-- 1. content_hash lets a re-upload of the same bytes reuse the existing video
+--    instead of storing and analysing it again. Older rows stay NULL.
+ALTER TABLE `bizbuddydemo-v2.inspo_data.inspoextractholder`
+    ADD COLUMN IF NOT EXISTS content_hash STRING;
+
+-- 2. The page-scoped manifest the gallery reads from, one row per video.
+--    poster_blob_name and thumbnail_blob_name point at the preview frames
+--    extracted at upload time; backfilled rows from before the manifest have
+--    no frames or hash. Clustered on page_id so a gallery page only scans that
+--    page's blocks.
+CREATE TABLE IF NOT EXISTS `bizbuddydemo-v2.inspo_data.inspiration_manifest` (
+    page_id INT64 NOT NULL,
+    video_id STRING NOT NULL,
+    blob_name STRING,
+    poster_blob_name STRING,
+    thumbnail_blob_name STRING,
+    content_type STRING,
+    size_bytes INT64,
+    content_hash STRING,
+    uploaded_at TIMESTAMP
+)
+CLUSTER BY page_id;
+
+-- If the manifest was created before preview frames were added
+ALTER TABLE `bizbuddydemo-v2.inspo_data.inspiration_manifest`
+    ADD COLUMN IF NOT EXISTS poster_blob_name STRING,
+    ADD COLUMN IF NOT EXISTS thumbnail_blob_name STRING;
@@ -0,0 +1,18 @@
+-- Schema changes for `bizbuddydemo-v2.strategy_data.postideas` used by the scheduler pages.
+-- Run once in the BigQuery console, in order, while no scheduler page is open
+-- (the rebuild in step 2 would drop edits flushed while it runs).
+
+-- 1. Columns: idea_id keys edits and deletes, updated_at drives the idea store's
+--    version check, post_time holds the slot picked by the allocator.
+--    Existing rows get an idea_id the first time their page loads.
+ALTER TABLE `bizbuddydemo-v2.strategy_data.postideas`
+    ADD COLUMN IF NOT EXISTS idea_id STRING,
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP,
+    ADD COLUMN IF NOT EXISTS post_time STRING;
+
+-- 2. Cluster on page_id so the per-page MERGE, backfill and version queries
+--    only scan that page's blocks. Clustering can't be added to an existing
+--    table in place, so the table is rewritten with the same rows.
+CREATE OR REPLACE TABLE `bizbuddydemo-v2.strategy_data.postideas`
+CLUSTER BY page_id
+AS SELECT * FROM `bizbuddydemo-v2.strategy_data.postideas`;
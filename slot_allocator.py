@@ -0,0 +1,75 @@
+"""
+Posting slot allocation for the scheduler pages.
+
+SlotAllocator spaces new post ideas at least POST_SPACING_DAYS apart from
+each other and from posts already scheduled, choosing days and hours from the
+reach-by-weekday-and-hour table that engagement_model.py writes alongside the
+page's model (model["slot_reach"]).
+"""
+import bisect
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# Minimum days between scheduled posts
+POST_SPACING_DAYS = 3
+
+
+class SlotAllocator:
+    """
+    Picks posting slots for new ideas without querying BigQuery. Scheduled days
+    are kept in a sorted index, so spacing conflicts are bisect lookups, and
+    days and hours are chosen from the page's reach-by-slot table.
+    """
+
+    def __init__(self, scheduled_dates, slot_reach=None, spacing_days=POST_SPACING_DAYS):
+        dates = pd.to_datetime(pd.Series(list(scheduled_dates), dtype=object), errors="coerce").dropna()
+        self._days = sorted(date.toordinal() for date in dates.dt.date)
+        # {weekday: {hour: average reach}}, weekday 0 is Monday
+        self.slot_reach = {int(day): {int(hour): reach for hour, reach in hours.items()} for day, hours in (slot_reach or {}).items()}
+        self.spacing_days = spacing_days
+
+    def is_free(self, day):
+        """True when no scheduled post is closer than spacing_days to the day (an ordinal)."""
+        i = bisect.bisect_right(self._days, day - self.spacing_days)
+        return i == len(self._days) or self._days[i] >= day + self.spacing_days
+
+    def reserve(self, day):
+        bisect.insort(self._days, day)
+
+    def day_score(self, day):
+        hours = self.slot_reach.get(datetime.fromordinal(day).weekday())
+        return max(hours.values()) if hours else 0.0
+
+    def best_hour(self, day):
+        hours = self.slot_reach.get(datetime.fromordinal(day).weekday())
+        return max(hours, key=hours.get) if hours else None
+
+    def allocate(self, count, start=None):
+        """
+        Reserve slots for count new posts.
+
+        Walks forward from start (tomorrow by default). From each window of
+        spacing_days days takes the free day with the best historical reach, then
+        starts the next window spacing_days after the pick.
+
+        Returns:
+            list: (date string, "HH:00" or None) for each post, in date order.
+        """
+        day = (start or datetime.now().date() + timedelta(days=1)).toordinal()
+        slots = []
+        while len(slots) < count:
+            window = [candidate for candidate in range(day, day + self.spacing_days) if self.is_free(candidate)]
+            if not window:
+                day += self.spacing_days
+                continue
+
+            # max() keeps the earliest day on ties, so pages without a slot table keep a steady cadence
+            best = max(window, key=self.day_score)
+            self.reserve(best)
+            hour = self.best_hour(best)
+            slots.append((datetime.fromordinal(best).date().isoformat(), f"{hour:02d}:00" if hour is not None else None))
+            # Every day before best + spacing_days is now too close, so the next window is all free days
+            day = best + self.spacing_days
+
+        return slots
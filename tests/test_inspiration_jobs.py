@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from functools import partial
+
+import pytest
+
+from inspiration_jobs import ANALYSIS_TIMEOUT, LOCAL_ANALYSIS_SECONDS, InspirationJobQueue, local_stand_in_analysis
+
+PAGE_ID = 17841467554159158
+
+
+class FakeClock:
+    def __init__(self):
+        self.current = datetime(2025, 1, 1, 12, 0)
+
+    def __call__(self):
+        return self.current
+
+    def advance(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_queue(clock, seconds=LOCAL_ANALYSIS_SECONDS):
+    check = partial(local_stand_in_analysis, seconds=seconds, now=clock)
+    return InspirationJobQueue(check, poll_interval=3600, now=clock)
+
+
+def states(queue):
+    return {job["video_id"]: job["state"] for job in queue.jobs(PAGE_ID)}
+
+
+def test_upload_moves_through_queued_analyzing_and_done(clock):
+    queue = make_queue(clock)
+    queue.submit(PAGE_ID, "video-1", "clip.mp4")
+    assert states(queue) == {"video-1": "queued"}
+
+    queue.poll()
+    assert states(queue) == {"video-1": "analyzing"}
+
+    clock.advance(LOCAL_ANALYSIS_SECONDS)
+    queue.poll()
+    assert states(queue) == {"video-1": "done"}
+
+
+def test_every_analyzing_job_is_checked_in_one_call(clock):
+    calls = []
+
+    def check(jobs):
+        calls.append(sorted(job["video_id"] for job in jobs))
+        return set()
+
+    queue = InspirationJobQueue(check, poll_interval=3600, now=clock)
+    for number in range(6):
+        queue.submit(PAGE_ID, f"video-{number}", f"clip-{number}.mp4")
+    queue.poll()
+
+    assert calls == [[f"video-{number}" for number in range(6)]]
+    assert set(states(queue).values()) == {"analyzing"}
+
+
+def test_job_fails_after_the_timeout_and_can_be_retried(clock):
+    queue = make_queue(clock, seconds=ANALYSIS_TIMEOUT.total_seconds() * 2)
+    queue.submit(PAGE_ID, "video-1", "clip.mp4")
+    queue.poll()
+
+    clock.advance(ANALYSIS_TIMEOUT.total_seconds())
+    queue.poll()
+    job = queue.jobs(PAGE_ID)[0]
+    assert job["state"] == "failed"
+    assert job["error"]
+
+    queue.retry("video-1")
+    assert states(queue) == {"video-1": "queued"}
+    queue.poll()
+    assert states(queue) == {"video-1": "analyzing"}
+
+
+def test_resubmitting_a_tracked_video_keeps_its_state(clock):
+    queue = make_queue(clock)
+    queue.submit(PAGE_ID, "video-1", "clip.mp4")
+    queue.poll()
+    queue.submit(PAGE_ID, "video-1", "clip.mp4")
+
+    assert states(queue) == {"video-1": "analyzing"}
+
+
+def test_failed_check_keeps_jobs_analyzing(clock):
+    def check(jobs):
+        raise ConnectionError("warehouse unavailable")
+
+    queue = InspirationJobQueue(check, poll_interval=3600, now=clock)
+    queue.submit(PAGE_ID, "video-1", "clip.mp4")
+    queue.poll()
+
+    assert states(queue) == {"video-1": "analyzing"}
+    assert isinstance(queue.last_error, ConnectionError)
@@ -0,0 +1,129 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from mutation_queue import MutationQueue, STORED_FIELDS
+
+PAGE_ID = 17841467554159158
+
+
+class FakeBigQuery:
+    """Applies the queue's MERGE to an in-memory postideas table, following the ops each WHEN clause names."""
+
+    def __init__(self):
+        self.rows = {}
+        self.merges = 0
+        self.during_merge = None
+
+    def query(self, query, job_config):
+        clauses = {}
+        for matched, ops, action in re.findall(r"WHEN (NOT MATCHED|MATCHED) AND S\.op (= '\w+'|IN \([^)]*\))\s+THEN\s+(\w+)", query):
+            clauses[(matched, action)] = set(re.findall(r"'(\w+)'", ops))
+
+        params = {param.name: param for param in job_config.query_parameters}
+        page_id = params["page_id"].value
+        previous = self.version(page_id)
+        for change in params["changes"].values:
+            values = change.struct_values
+            key = (page_id, values["idea_id"])
+            row = {field: values[field] for field in STORED_FIELDS}
+            if key in self.rows:
+                if values["op"] in clauses.get(("MATCHED", "DELETE"), ()):
+                    del self.rows[key]
+                elif values["op"] in clauses.get(("MATCHED", "UPDATE"), ()):
+                    self.rows[key] = row
+            elif values["op"] in clauses.get(("NOT MATCHED", "INSERT"), ()):
+                self.rows[key] = row
+
+        self.merges += 1
+        current = self.version(page_id)
+        self._result = [SimpleNamespace(previous_updated_at=previous[0], previous_idea_count=previous[1],
+                                        updated_at=current[0], idea_count=current[1])]
+
+        if self.during_merge:
+            self.during_merge()
+        return self
+
+    def result(self):
+        return self._result
+
+    def version(self, page_id):
+        # The merge counter stands in for MAX(updated_at)
+        return self.merges, sum(1 for row_page_id, _ in self.rows if row_page_id == page_id)
+
+
+def idea_row(caption):
+    return dict.fromkeys(STORED_FIELDS, "") | {"caption": caption}
+
+
+@pytest.fixture
+def bq():
+    return FakeBigQuery()
+
+
+@pytest.fixture
+def queue(bq, tmp_path):
+    return MutationQueue(bq, path=str(tmp_path / "journal.sqlite"), flush_interval=3600)
+
+
+def test_replayed_insert_applies_a_folded_update(bq, queue):
+    queue.enqueue(PAGE_ID, "idea-1", "insert", idea_row("first"))
+    changes = [(idea_id, op, row, 0) for idea_id, (op, row) in queue.pending(PAGE_ID).items()]
+
+    # The MERGE lands, but the app stops before the journal is cleared
+    queue._merge(PAGE_ID, changes)
+    assert bq.rows[(PAGE_ID, "idea-1")]["caption"] == "first"
+
+    # A later edit folds into the still-journaled insert, and the replay must apply it
+    queue.enqueue(PAGE_ID, "idea-1", "update", idea_row("second"))
+    assert queue.pending(PAGE_ID)["idea-1"][0] == "insert"
+    queue.flush()
+
+    assert bq.rows[(PAGE_ID, "idea-1")]["caption"] == "second"
+    assert queue.pending(PAGE_ID) == {}
+
+
+def test_edit_made_while_the_merge_runs_is_flushed_next_time(bq, queue):
+    queue.enqueue(PAGE_ID, "idea-1", "insert", idea_row("first"))
+    bq.during_merge = lambda: queue.enqueue(PAGE_ID, "idea-1", "update", idea_row("second"))
+    queue.flush()
+
+    bq.during_merge = None
+    assert queue.pending(PAGE_ID)["idea-1"] == ("insert", idea_row("second"))
+    queue.flush()
+
+    assert bq.rows[(PAGE_ID, "idea-1")]["caption"] == "second"
+    assert queue.pending(PAGE_ID) == {}
+
+
+def test_delete_made_while_the_merge_runs_removes_the_inserted_row(bq, queue):
+    queue.enqueue(PAGE_ID, "idea-1", "insert", idea_row("first"))
+    bq.during_merge = lambda: queue.enqueue(PAGE_ID, "idea-1", "delete")
+    queue.flush()
+
+    bq.during_merge = None
+    assert queue.pending(PAGE_ID)["idea-1"][0] == "delete"
+    queue.flush()
+
+    assert bq.rows == {}
+    assert queue.pending(PAGE_ID) == {}
+
+
+def test_flush_reports_the_page_version_around_the_merge(bq, tmp_path):
+    flushed = []
+    queue = MutationQueue(bq, path=str(tmp_path / "journal.sqlite"), flush_interval=3600,
+                          on_flush=lambda page_id, changes, versions: flushed.append((page_id, changes, versions)))
+    queue.enqueue(PAGE_ID, "idea-1", "insert", idea_row("first"))
+    queue.flush()
+
+    assert flushed == [(PAGE_ID, {"idea-1": ("insert", idea_row("first"))}, (("0", 0), ("1", 1)))]
+
+
+def test_delete_of_an_unflushed_insert_leaves_no_row(bq, queue):
+    queue.enqueue(PAGE_ID, "idea-1", "insert", idea_row("first"))
+    queue.enqueue(PAGE_ID, "idea-1", "delete")
+    queue.flush()
+
+    assert queue.pending(PAGE_ID) == {}
+    assert bq.rows == {}
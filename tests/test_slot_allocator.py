@@ -0,0 +1,43 @@
+from datetime import date
+
+from slot_allocator import POST_SPACING_DAYS, SlotAllocator
+
+MONDAY = date(2026, 10, 19)
+SATURDAY = 5
+
+# Saturday reaches ten times as many people as any other day
+SLOT_REACH = {str(weekday): {"18": 1000.0 if weekday == SATURDAY else 100.0} for weekday in range(7)}
+
+
+def pick_days(slots):
+    return [date.fromisoformat(day) for day, _ in slots]
+
+
+def test_each_pick_chooses_the_best_day_of_a_free_window():
+    slots = SlotAllocator([], SLOT_REACH).allocate(8, start=MONDAY)
+    days = pick_days(slots)
+
+    gaps = [(later - earlier).days for earlier, later in zip(days, days[1:])]
+    assert all(POST_SPACING_DAYS <= gap < 2 * POST_SPACING_DAYS for gap in gaps)
+
+    # Every window after the first starts spacing_days after the last pick, so a Saturday in it wins
+    for previous, day in zip(days, days[1:]):
+        window = [date.fromordinal(previous.toordinal() + POST_SPACING_DAYS + offset) for offset in range(POST_SPACING_DAYS)]
+        if any(candidate.weekday() == SATURDAY for candidate in window):
+            assert day.weekday() == SATURDAY
+    assert sum(day.weekday() == SATURDAY for day in days) >= 3
+    assert all(hour == "18:00" for _, hour in slots)
+
+
+def test_picks_keep_their_distance_from_scheduled_posts():
+    scheduled = ["2026-10-24"]
+    days = pick_days(SlotAllocator(scheduled, SLOT_REACH).allocate(4, start=MONDAY))
+
+    for day in days:
+        assert abs((day - date(2026, 10, 24)).days) >= POST_SPACING_DAYS
+
+
+def test_pages_without_a_slot_table_keep_a_steady_cadence():
+    slots = SlotAllocator([]).allocate(3, start=MONDAY)
+
+    assert slots == [("2026-10-19", None), ("2026-10-22", None), ("2026-10-25", None)]